@@ -11,15 +11,31 @@ import threading
 from time import sleep
 import re
 import sys
-from flask import Flask, request, jsonify
+import ctypes
+import ctypes.util
+import tempfile
+import wave
+import bisect
+import functools
+import math
+import contextlib
+import itertools
+import struct
+import uuid
+import random
+import email.utils
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from queue import Queue, Empty
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 import undetected_chromedriver as uc
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
 app = Flask(__name__)
@@ -32,6 +48,9 @@ bot_state = {
     'thread': None,
     'driver': None,  
     'audio_streamer': None,
+    'join': None,
+    'trace': None,
+    'start_monotonic': None,
     'last_health_check': datetime.datetime.now()
 }
 
@@ -81,6 +100,7 @@ def start_bot():
         duration = data.get('duration', 60)
         token = data.get('token')
         interview_id = data.get('interview_id')
+        audio_options = data.get('audio') or {}
 
         if not meet_link:
             return jsonify({
@@ -88,16 +108,28 @@ def start_bot():
                 'error': 'Meeting link is required'
             }), 400
 
+        try:
+            validate_audio_options(audio_options)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
         os.environ['GMEET_LINK'] = meet_link
         os.environ['DURATION_IN_MINUTES'] = str(duration)
 
         bot_state['status'] = 'starting'
         bot_state['current_meeting'] = meet_link
         bot_state['start_time'] = datetime.datetime.now()
+        bot_state['start_monotonic'] = time.monotonic()
+        bot_state['join'] = None
+        trace = start_join_trace(bot_state['start_monotonic'])
+        bot_state['trace'] = trace
 
         def run_bot():
             try:
-                asyncio.run(join_meet(meet_link, duration, token, interview_id))
+                asyncio.run(join_meet(meet_link, duration, token, interview_id, audio_options))
             except Exception as e:
                 print(f"Error in bot thread: {e}")
                 bot_state['status'] = 'error'
@@ -111,6 +143,7 @@ def start_bot():
         return jsonify({
             'success': True,
             'status': 'starting',
+            'session_id': trace.session_id,
             'meet_link': meet_link,
             'duration': duration,
             'message': 'Bot is starting and will join the meeting shortly'
@@ -136,11 +169,12 @@ def stop_bot():
         print("Stop signal received, cleaning up bot...")
         bot_state['status'] = 'stopping'
         
-        cleanup_bot()
+        drain = cleanup_bot()
         
         return jsonify({
             'success': True,
-            'message': 'Bot stopped successfully'
+            'message': 'Bot stopped successfully',
+            'audio_drain': drain
         })
 
     except Exception as e:
@@ -152,29 +186,31 @@ def stop_bot():
         }), 500
     
 def cleanup_bot():
-    """Cleanup bot resources - stop audio, quit driver"""
+    """Cleanup bot resources - stop audio, release driver; returns the audio drain result"""
     print("Cleaning up bot resources...")
     
-    if bot_state['audio_streamer']:
+    drain = None
+    streamer = bot_state['audio_streamer']
+    if streamer:
         try:
-            bot_state['audio_streamer'].stop_streaming()
+            streamer.stop_streaming()
+            # The meeting audio is already captured, so let it reach the backend before Chrome goes
+            drain = streamer.wait_drained(streamer.drain_seconds + 2)
             print("Audio streamer stopped")
         except Exception as e:
             print(f"Error stopping audio streamer: {e}")
     
-    if bot_state['driver']:
-        try:
-            bot_state['driver'].quit()
-            print("Chrome driver quit")
-        except Exception as e:
-            print(f"Error quitting driver: {e}")
+    driver = bot_state['driver']
+    bot_state['driver'] = None
+    # Mid-join the browser may not be signed in yet and the join flow still holds it
+    release_driver(driver, reuse=bot_state['join'] is not None)
     
     bot_state['status'] = 'idle'
     bot_state['current_meeting'] = None
-    bot_state['driver'] = None
     bot_state['audio_streamer'] = None
     
     print("Bot cleanup complete")
+    return drain
 
 @app.route('/status', methods=['GET'])
 def get_status():
@@ -183,7 +219,90 @@ def get_status():
         'status': bot_state['status'],
         'isRunning': bot_state['status'] == 'running',
         'current_meeting': bot_state['current_meeting'],
-        'uptime': (datetime.datetime.now() - bot_state['start_time']).total_seconds() if bot_state['start_time'] else 0
+        'uptime': (datetime.datetime.now() - bot_state['start_time']).total_seconds() if bot_state['start_time'] else 0,
+        'audio': bot_state['audio_streamer'].get_status() if bot_state['audio_streamer'] else None,
+        'join': bot_state['join'],
+        'browser_pool': browser_pool.get_status() if browser_pool else None
+    })
+
+@app.route('/metrics/join', methods=['GET'])
+def join_metrics_endpoint():
+    return jsonify({
+        'success': True,
+        'join': join_metrics['join'].get_status(),
+        'time_to_audio': join_metrics['time_to_audio'].get_status(),
+        'phases': {state: histogram.get_status() for state, histogram in join_metrics['phases'].items()},
+        'commands': {name: histogram.get_status() for name, histogram in list(join_metrics['commands'].items())}
+    })
+
+@app.route('/sessions/<session_id>/trace', methods=['GET'])
+def session_trace(session_id):
+    """Join timeline as Chrome trace-event JSON; 'current' names the latest session"""
+    trace = bot_state['trace'] if session_id == 'current' else join_traces.get(session_id)
+    if not trace:
+        return jsonify({
+            'success': False,
+            'error': 'No such trace'
+        }), 404
+    response = jsonify(trace.to_json())
+    response.headers['Content-Disposition'] = f'attachment; filename="join-trace-{trace.session_id}.json"'
+    return response
+
+@app.route('/metrics/audio', methods=['GET'])
+def audio_metrics():
+    streamer = bot_state['audio_streamer']
+    if not streamer:
+        return jsonify({
+            'success': False,
+            'error': 'No audio stream is running'
+        }), 404
+    status = streamer.get_status()
+    return jsonify({
+        'success': True,
+        'latency': status['latency'],
+        'bytes_transmitted': status['bytes_transmitted'],
+        'buffered_bytes': status['buffered_bytes']
+    })
+
+@app.route('/metrics/selectors', methods=['GET'])
+def selector_metrics():
+    return jsonify({
+        'success': True,
+        'phases': get_selector_stats().get_status()
+    })
+
+@app.route('/sessions/<session_id>/audio', methods=['GET'])
+def session_audio(session_id):
+    """Live captured audio as a chunked s16le stream; 'current' names whichever session is running"""
+    streamer = bot_state['audio_streamer']
+    if not streamer or session_id not in (streamer.session_id, 'current'):
+        return jsonify({
+            'success': False,
+            'error': 'No such audio session'
+        }), 404
+
+    subscriber = streamer.fanout.subscribe()
+    print(f"Audio subscriber {subscriber.subscriber_id} joined session {streamer.session_id}")
+
+    def generate():
+        try:
+            while True:
+                chunk = subscriber.read()
+                if chunk is None:
+                    break
+                if chunk:
+                    # WSGI servers only write bytes, so this is the copy the socket write needs
+                    yield bytes(chunk)
+        finally:
+            subscriber.close()
+            print(f"Audio subscriber {subscriber.subscriber_id} left")
+
+    return Response(generate(), mimetype='application/octet-stream', headers={
+        'X-Audio-Session': streamer.session_id,
+        'X-Audio-Format': 's16le',
+        'X-Audio-Sample-Rate': str(SAMPLE_RATE),
+        'X-Audio-Channels': str(CHANNELS),
+        'Cache-Control': 'no-store'
     })
 
 @app.route('/', methods=['GET'])
@@ -195,420 +314,3942 @@ def index():
             'health': '/health',
             'start': 'POST /start',
             'stop': 'POST /stop',
-            'status': '/status'
+            'status': '/status',
+            'audio_metrics': '/metrics/audio',
+            'selector_metrics': '/metrics/selectors',
+            'join_metrics': '/metrics/join',
+            'session_audio': '/sessions/<session_id>/audio',
+            'session_trace': '/sessions/<session_id>/trace'
         }
     })
 
-class RealtimeAudioStreamer:
-    def __init__(self, backend_url):
-        self.backend_url = backend_url
-        self.ws_url = backend_url.replace('http', 'ws') + '/ws/audio'
-        self.websocket = None
-        self.is_streaming = False
-        self.stream_process = None
-        self.bytes_transmitted = 0
-        self.last_activity_time = datetime.datetime.now()
-        self.is_connected = False
-        self.reconnect_attempts = 0
-        self.max_reconnect_attempts = 10
-        self.reconnect_delay = 5
-        self.audio_queue = Queue()
-        self._stop_event = threading.Event()
-        
-    async def connect_websocket(self):
-        """Connect to backend WebSocket for audio streaming"""
-        try:
-            print(f"Connecting to audio WebSocket: {self.ws_url}")
-            
-            self.websocket = await websockets.connect(
-                self.ws_url,
-                ping_interval=20,
-                ping_timeout=10,
-                close_timeout=5,
-                max_size=None,  
-            )
-            
-            print("Connected to audio WebSocket")
-            self.is_connected = True
-            self.reconnect_attempts = 0
-            return True
-            
-        except Exception as e:
-            print(f"WebSocket connection failed: {e}")
-            self.is_connected = False
-            self.reconnect_attempts += 1
-            return False
+SAMPLE_RATE = 16000
+CHANNELS = 1
+SAMPLE_WIDTH = 2
+BYTES_PER_SECOND = SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH
 
-    def _is_websocket_open(self):
-        """Check if WebSocket connection is open"""
-        if not self.websocket:
-            return False
-        
-        try:
-            if hasattr(self.websocket, 'state'):
-                return self.websocket.state == websockets.protocol.State.OPEN
-            elif hasattr(self.websocket, 'closed'):
-                return not self.websocket.closed
-            else:
-                return True
-        except Exception:
-            return False
+class _PaSampleSpec(ctypes.Structure):
+    _fields_ = [
+        ('format', ctypes.c_int),
+        ('rate', ctypes.c_uint32),
+        ('channels', ctypes.c_uint8),
+    ]
 
-    def start_realtime_streaming(self, duration_minutes=60):
-        """Start real-time audio streaming to backend"""
-        if self.is_streaming:
-            print("Audio streaming already running")
-            return None
+class _PaBufferAttr(ctypes.Structure):
+    _fields_ = [
+        ('maxlength', ctypes.c_uint32),
+        ('tlength', ctypes.c_uint32),
+        ('prebuf', ctypes.c_uint32),
+        ('minreq', ctypes.c_uint32),
+        ('fragsize', ctypes.c_uint32),
+    ]
 
-        self.is_streaming = True
-        self._stop_event.clear()
-        
-        capture_thread = threading.Thread(
-            target=self._capture_audio,
-            daemon=True,
-            name="AudioCaptureThread"
-        )
-        capture_thread.start()
-        
-        sender_thread = threading.Thread(
-            target=self._run_websocket_sender,
-            daemon=True,
-            name="WebSocketSenderThread"
-        )
-        sender_thread.start()
-        
-        return [capture_thread, sender_thread]
+class PulseSimpleCaptureBackend:
+    """Read PCM straight from PulseAudio in-process through libpulse-simple
 
-    def _capture_audio(self):
-        """Capture system audio output (speakers) instead of microphone input"""
-        print("Starting system audio capture...")
+    pa_simple_read cannot be interrupted, so abort() only abandons the
+    stream: a read already blocked keeps its thread until it returns, then
+    frees the stream and hands back nothing.
+    """
+    name = 'pulse-simple'
+    interruptible = False
 
-        try:
-            subprocess.run(["sox", "--version"], capture_output=True, check=True)
-            print("Sox is available")
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            print("Error: sox is not installed or not in PATH")
-            self.is_streaming = False
-            return
+    PA_STREAM_RECORD = 2
+    PA_SAMPLE_S16LE = 3
 
-        self._setup_system_audio_capture()
+    _lib = None
 
-    def _setup_system_audio_capture(self):
-        """Set up system audio capture using PulseAudio"""
-        print("Setting up system audio capture...")
-        
-        try:
-            self._setup_virtual_audio_sink()
-            
-            audio_source = "virtual_speaker.monitor"
-            
-            print(f"Capturing system audio from: {audio_source}")
-            
-            parec_command = [
-                "parec",
-                "--format=s16le",
-                "--rate=16000",
-                "--channels=1",
-                f"--device={audio_source}",
-                "--latency=1"
-            ]
+    def __init__(self, device, fragment_size=4096):
+        self.device = device
+        self.fragment_size = fragment_size
+        self._handle = None
+        self._scratch = None
+        self._reading = False
+        self._abandoned = False
+        self._lock = threading.Lock()
 
-            sox_command = [
-                "sox",
-                "-q",
-                "-t", "raw",
-                "-r", "16000", 
-                "-c", "1",
-                "-b", "16",
-                "-e", "signed-integer",
-                "-",  
-                "-t", "raw",
-                "-"
+    @classmethod
+    def _load_library(cls):
+        if cls._lib is None:
+            path = ctypes.util.find_library('pulse-simple') or 'libpulse-simple.so.0'
+            lib = ctypes.CDLL(path)
+            lib.pa_simple_new.restype = ctypes.c_void_p
+            lib.pa_simple_new.argtypes = [
+                ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_char_p,
+                ctypes.POINTER(_PaSampleSpec), ctypes.c_void_p, ctypes.POINTER(_PaBufferAttr),
+                ctypes.POINTER(ctypes.c_int)
             ]
+            lib.pa_simple_read.restype = ctypes.c_int
+            lib.pa_simple_read.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t, ctypes.POINTER(ctypes.c_int)]
+            lib.pa_simple_free.restype = None
+            lib.pa_simple_free.argtypes = [ctypes.c_void_p]
+            lib.pa_strerror.restype = ctypes.c_char_p
+            lib.pa_strerror.argtypes = [ctypes.c_int]
+            cls._lib = lib
+        return cls._lib
 
-            print(f"Starting audio capture process...")
-            parec_process = subprocess.Popen(
-                parec_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=8192
-            )
-            sox_process = subprocess.Popen(
-                sox_command, stdin=parec_process.stdout, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=8192
-            )
-            parec_process.stdout.close()
-            self.stream_process = sox_process
-            
-            print(f"System audio capture started (Sox PID: {sox_process.pid}, Parec PID: {parec_process.pid})")
-            self._read_audio_data()
-            
-        except Exception as e:
-            print(f"System audio capture error: {e}")
-            self._fallback_audio_capture()
+    def open(self):
+        lib = self._load_library()
+        spec = _PaSampleSpec(self.PA_SAMPLE_S16LE, SAMPLE_RATE, CHANNELS)
+        # Ask for fragments of one read chunk, like parec --latency, so reads return promptly
+        unset = 0xFFFFFFFF
+        attr = _PaBufferAttr(unset, unset, unset, unset, self.fragment_size)
+        error = ctypes.c_int(0)
+        handle = lib.pa_simple_new(
+            None, b"gmeet-bot", self.PA_STREAM_RECORD, self.device.encode(), b"meeting-audio",
+            ctypes.byref(spec), None, ctypes.byref(attr), ctypes.byref(error)
+        )
+        if not handle:
+            raise RuntimeError(f"pa_simple_new failed: {lib.pa_strerror(error.value).decode()}")
+        self._handle = handle
+        print(f"In-process PulseAudio capture started on {self.device}")
+        return self
 
-    def _setup_virtual_audio_sink(self):
-        """Create and setup virtual audio sink for system audio capture"""
-        try:
-            print("Setting up virtual audio sink...")
-            
-            result = subprocess.run(
-                ["pactl", "list", "short", "sinks"],
-                capture_output=True, text=True, check=True
-            )
-            
-            if "virtual_speaker" not in result.stdout:
-                print("Creating virtual audio sink...")
-                subprocess.run([
-                    "pactl", "load-module", "module-null-sink", 
-                    "sink_name=virtual_speaker", 
-                    "sink_properties=device.description=Virtual-Speaker-for-Recording"
-                ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                
-                subprocess.run([
-                    "pactl", "load-module", "module-loopback", 
-                    "source=@DEFAULT_MONITOR@", 
-                    "sink=virtual_speaker",
-                    "latency_msec=1"
-                ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                
-                print("Virtual audio sink created successfully")
-            else:
-                print("Virtual audio sink already exists")
-                
-            print("Available audio sources:")
-            subprocess.run(["pactl", "list", "short", "sources"], check=False)
-                
-        except Exception as e:
-            print(f"Warning: Could not setup virtual audio sink: {e}")
+    def readinto(self, buffer):
+        """Fill the whole writable buffer with captured PCM, returns bytes read"""
+        size = len(buffer)
+        with self._lock:
+            if not self._handle or self._abandoned or size == 0:
+                return 0
+            self._reading = True
+        if self._scratch is None or len(self._scratch) < size:
+            self._scratch = ctypes.create_string_buffer(size)
+        error = ctypes.c_int(0)
+        # Read into scratch, not the caller's buffer: once abandoned, that memory belongs to a new reader
+        result = self._lib.pa_simple_read(self._handle, self._scratch, size, ctypes.byref(error))
+        with self._lock:
+            self._reading = False
+            abandoned = self._abandoned
+            if not abandoned and result >= 0:
+                ctypes.memmove((ctypes.c_char * size).from_buffer(buffer), self._scratch, size)
+        if abandoned:
+            self.close()
+            return 0
+        if result < 0:
+            raise RuntimeError(f"pa_simple_read failed: {self._lib.pa_strerror(error.value).decode()}")
+        return size
 
-    def _fallback_audio_capture(self):
-        """Fallback method using default system audio monitor"""
-        try:
-            print("Using fallback system audio capture...")
-            
-            audio_source = "@DEFAULT_MONITOR@"
-            
-            parec_command = [
-                "parec",
-                "--format=s16le",
-                "--rate=16000", 
-                "--channels=1",
-                f"--device={audio_source}",
-                "--latency=1"
-            ]
+    def read(self, size):
+        buffer = bytearray(size)
+        return bytes(buffer[:self.readinto(buffer)])
 
-            sox_command = [
-                "sox",
-                "-q",
-                "-t", "raw",
-                "-r", "16000",
-                "-c", "1",
-                "-b", "16",
-                "-e", "signed-integer", 
-                "-",
-                "-t", "raw",
-                "-"
-            ]
+    def is_alive(self):
+        return self._handle is not None and not self._abandoned
 
-            print(f"Fallback: Capturing from {audio_source}")
-            parec_process = subprocess.Popen(
-                parec_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=8192
-            )
-            sox_process = subprocess.Popen(
-                sox_command, stdin=parec_process.stdout, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=8192
-            )
-            parec_process.stdout.close()
-            self.stream_process = sox_process
-            
-            self._read_audio_data()
-            
-        except Exception as e:
-            print(f"Fallback audio capture error: {e}")
-            self.is_streaming = False
+    def abort(self):
+        with self._lock:
+            self._abandoned = True
 
-    def _read_audio_data(self):
-        """Read audio data from the stream process"""
-        chunk_size = 4096
-        
-        while self.is_streaming and not self._stop_event.is_set() and self.stream_process and self.stream_process.poll() is None:
-            try:
-                audio_data = self.stream_process.stdout.read(chunk_size)
-                if not audio_data:
-                    time.sleep(0.05)
-                    continue
-                    
-                self.audio_queue.put(audio_data)
-                self.bytes_transmitted += len(audio_data)
-                self.last_activity_time = datetime.datetime.now()
+    def close(self):
+        with self._lock:
+            if self._reading:
+                # Freed by the blocked read once it returns
+                self._abandoned = True
+                return
+            handle, self._handle = self._handle, None
+        if handle:
+            self._lib.pa_simple_free(handle)
 
-                if self.bytes_transmitted % (500 * 1024) < chunk_size:
-                    print(f"📊 System audio captured: {self.bytes_transmitted / 1024:.2f} KB")
-                    
-            except Exception as e:
-                print(f"Error reading audio data: {e}")
-                break
+class SubprocessCaptureBackend:
+    """Capture through a parec | sox pipeline, kept as the fallback path"""
+    name = 'parec-sox'
+    interruptible = True
 
-    def _run_websocket_sender(self):
-        """Run WebSocket sender in a separate event loop"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+    def __init__(self, device, fragment_size=4096):
+        self.device = device
+        self.fragment_size = fragment_size
+        self.parec_process = None
+        self.sox_process = None
+
+    def open(self):
+        parec_command = [
+            "parec",
+            "--format=s16le",
+            f"--rate={SAMPLE_RATE}",
+            f"--channels={CHANNELS}",
+            f"--device={self.device}",
+            "--latency=1"
+        ]
+
+        sox_command = [
+            "sox",
+            "-q",
+            "--buffer", str(self.fragment_size),
+            "-t", "raw",
+            "-r", str(SAMPLE_RATE),
+            "-c", str(CHANNELS),
+            "-b", "16",
+            "-e", "signed-integer",
+            "-",  
+            "-t", "raw",
+            "-"
+        ]
+
+        print(f"Starting audio capture process...")
+        self.parec_process = subprocess.Popen(
+            parec_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=8192
+        )
         try:
-            loop.run_until_complete(self._websocket_sender_async())
-        finally:
-            loop.close()
+            self.sox_process = subprocess.Popen(
+                sox_command, stdin=self.parec_process.stdout, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=8192
+            )
+        except Exception:
+            self.close()
+            raise
+        self.parec_process.stdout.close()
 
-    async def _websocket_sender_async(self):
-        """Async WebSocket sender that reads from queue and sends to server"""
-        print("Starting WebSocket sender...")
-        
-        if not await self.connect_websocket():
-            print("Failed initial WebSocket connection")
-            self.is_streaming = False
-            return
+        print(f"System audio capture started (Sox PID: {self.sox_process.pid}, Parec PID: {self.parec_process.pid})")
+        return self
 
-        last_stats_time = datetime.datetime.now()
-        
-        while self.is_streaming and not self._stop_event.is_set():
-            try:
-                try:
-                    audio_data = self.audio_queue.get(timeout=1.0)
-                except Empty:
-                    continue
+    def readinto(self, buffer):
+        # Straight from the pipe into the caller's buffer, skipping the BufferedReader copy
+        return os.readv(self.fileno(), [buffer])
 
-                if self._is_websocket_open():
-                    try:
-                        await self.websocket.send(audio_data)
-                        
-                        current_time = datetime.datetime.now()
-                        if (current_time - last_stats_time).total_seconds() >= 30:
-                            kb_transmitted = self.bytes_transmitted / 1024
-                            queue_size = self.audio_queue.qsize()
-                            print(f"📈 Streaming stats: {kb_transmitted:.2f} KB sent, queue: {queue_size}")
-                            last_stats_time = current_time
-                            
-                    except (websockets.exceptions.ConnectionClosed, 
-                           websockets.exceptions.WebSocketException) as e:
-                        print(f"🔌 WebSocket send error: {e}")
-                        self.is_connected = False
-                        
-                        if not await self._reconnect_websocket():
-                            print("Failed to reconnect WebSocket")
-                            break
-                
-                self.audio_queue.task_done()
-                
-            except Exception as e:
-                print(f"WebSocket sender error: {e}")
-                await asyncio.sleep(0.1)
+    def fileno(self):
+        return self.sox_process.stdout.fileno()
 
-        print("WebSocket sender stopped")
+    def read(self, size):
+        return self.sox_process.stdout.read(size)
 
-    async def _reconnect_websocket(self):
-        """Attempt to reconnect WebSocket with backoff"""
-        if self.reconnect_attempts >= self.max_reconnect_attempts:
-            print("Max reconnection attempts reached")
-            return False
+    def is_alive(self):
+        return self.sox_process is not None and self.sox_process.poll() is None
 
-        delay = min(self.reconnect_delay * (2 ** self.reconnect_attempts), 60)
-        print(f"Attempting reconnect in {delay}s (attempt {self.reconnect_attempts + 1})")
-        
-        await asyncio.sleep(delay)
-        
-        if await self.connect_websocket():
-            print("WebSocket reconnected successfully")
-            while not self.audio_queue.empty():
-                try:
-                    self.audio_queue.get_nowait()
-                    self.audio_queue.task_done()
-                except Empty:
-                    break
-            return True
-        else:
-            return False
+    def abort(self):
+        """Kill both processes from any thread so a blocked read hits end of file"""
+        for process in (self.parec_process, self.sox_process):
+            if process and process.poll() is None:
+                process.kill()
 
-    def _cleanup_audio_capture(self):
-        """Clean up audio capture resources"""
-        if self.stream_process:
-            print(f"Stopping audio process (PID: {self.stream_process.pid})...")
+    def close(self):
+        for process in (self.sox_process, self.parec_process):
+            if not process:
+                continue
             try:
-                self.stream_process.terminate()
+                process.terminate()
                 try:
-                    self.stream_process.wait(timeout=5)
+                    process.wait(timeout=5)
                 except subprocess.TimeoutExpired:
-                    self.stream_process.kill()
-                    self.stream_process.wait()
+                    process.kill()
+                    process.wait()
             except Exception as e:
-                print(f"Error stopping audio process: {e}")
-            finally:
-                self.stream_process = None
+                print(f"Error stopping audio process (PID: {process.pid}): {e}")
+        self.sox_process = None
+        self.parec_process = None
 
-    async def cleanup(self):
-        """Clean up all streaming resources"""
-        print("Cleaning up audio streamer...")
-        self.is_streaming = False
-        self._stop_event.set()
-        self.is_connected = False
-        
-        self._cleanup_audio_capture()
-        
-        while not self.audio_queue.empty():
-            try:
-                self.audio_queue.get_nowait()
-                self.audio_queue.task_done()
-            except Empty:
-                break
-        
-        if self.websocket and not self.websocket.closed:
-            try:
-                await self.websocket.close()
-                print("Audio WebSocket connection closed")
-            except Exception as e:
-                print(f"Error closing WebSocket: {e}")
-            self.websocket = None
-        
-        print(f"Final stats: {self.bytes_transmitted / 1024:.2f} KB transmitted total")
+CAPTURE_BACKENDS = {
+    PulseSimpleCaptureBackend.name: PulseSimpleCaptureBackend,
+    SubprocessCaptureBackend.name: SubprocessCaptureBackend,
+}
 
-    def stop_streaming(self):
-        """Stop streaming synchronously"""
+def open_capture_backend(device, preferred="auto", fragment_size=4096):
+    """Open the first working capture backend, in-process reader first"""
+    order = list(CAPTURE_BACKENDS)
+    if preferred in CAPTURE_BACKENDS:
+        order.remove(preferred)
+        order.insert(0, preferred)
+
+    last_error = None
+    for name in order:
+        try:
+            return CAPTURE_BACKENDS[name](device, fragment_size).open()
+        except Exception as e:
+            print(f"Capture backend {name} unavailable: {e}")
+            last_error = e
+    raise RuntimeError(f"No capture backend could open {device}: {last_error}")
+
+STREAM_PROFILES = {
+    'low-latency': {'frame_ms': 20, 'min_frame_ms': 20},
+    'balanced': {'frame_ms': 128, 'min_frame_ms': 128},
+    'throughput': {'frame_ms': 1000, 'min_frame_ms': 500},
+}
+
+def ms_to_bytes(milliseconds):
+    """Byte length of a whole number of samples lasting the given milliseconds"""
+    return int(milliseconds * SAMPLE_RATE / 1000) * CHANNELS * SAMPLE_WIDTH
+
+def positive_number(value, name, integer=False, allow_zero=False):
+    """value as a finite number above zero (or zero, with allow_zero), else ValueError naming the option"""
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if not math.isfinite(number) or number < 0 or (number == 0 and not allow_zero):
+        raise ValueError(f"{name} must be {'zero or more' if allow_zero else 'positive'}, got {value!r}")
+    if integer:
+        if not number.is_integer():
+            raise ValueError(f"{name} must be a whole number, got {value!r}")
+        return int(number)
+    return number
+
+def get_stream_profile(name, frame_ms=None):
+    """Resolve a streaming profile name, optionally overriding its frame size"""
+    if name not in STREAM_PROFILES:
+        raise ValueError(f"Unknown streaming profile '{name}', expected one of {', '.join(STREAM_PROFILES)}")
+    profile = dict(STREAM_PROFILES[name], name=name)
+    if frame_ms is not None:
+        profile['frame_ms'] = positive_number(frame_ms, 'frame_ms', integer=True)
+        profile['min_frame_ms'] = min(profile['min_frame_ms'], profile['frame_ms'])
+    return profile
+
+OVERFLOW_POLICIES = ('drop-newest', 'drop-oldest', 'spill-to-disk')
+
+AUDIO_CODECS = ('raw', 'flac', 'opus')
+
+GAP_MODES = ('pad', 'flag', 'off')
+
+# 'auto' frames audio only if the backend acknowledges the frame header, 'framed' always does, 'legacy' never
+AUDIO_PROTOCOLS = ('auto', 'framed', 'legacy')
+AUDIO_PROTOCOL_VERSION = 1
+
+# version, flags, header size, sequence number, stream position in samples, capture time in µs since the epoch
+AUDIO_FRAME_HEADER = struct.Struct('!BBHIQQ')
+FRAME_FLAG_REPLAY = 0x01
+FRAME_FLAG_DISCONTINUITY = 0x02
+FRAME_FLAG_ENCODED = 0x04
+FRAME_FLAG_FORMAT_CHANGE = 0x08
+
+def pack_frame_header(flags, seq, position, captured_at=None):
+    """Binary frame header for the PCM at byte position, captured at a time.monotonic() reading"""
+    capture_us = int((time.time() - time.monotonic() + captured_at) * 1e6) if captured_at else 0
+    return AUDIO_FRAME_HEADER.pack(
+        AUDIO_PROTOCOL_VERSION, flags, AUDIO_FRAME_HEADER.size,
+        seq & 0xFFFFFFFF, position // (SAMPLE_WIDTH * CHANNELS), capture_us
+    )
+
+# 'failover' streams to one destination with the rest as hot standbys, 'mirror' streams to all of them
+DESTINATION_MODES = ('failover', 'mirror')
+
+# Best first; the adaptive controller steps down this list under congestion. Capture always stays 16 kHz PCM.
+QUALITY_TIERS = (
+    {'name': 'pcm-16k', 'codec': 'raw', 'sample_rate': 16000, 'bitrate': None},
+    {'name': 'opus-16k-32kbps', 'codec': 'opus', 'sample_rate': 16000, 'bitrate': 32000},
+    {'name': 'opus-8k-16kbps', 'codec': 'opus', 'sample_rate': 8000, 'bitrate': 16000},
+)
+
+class FfmpegAudioEncoder:
+    """Stream PCM through one long-lived ffmpeg process per connection
+
+    encode() writes a frame to ffmpeg and returns whatever encoded bytes
+    are ready, so output trails input by the encoder's own buffering.
+    """
+
+    def __init__(self, codec, bitrate=32000, frame_ms=20, sample_rate=SAMPLE_RATE):
+        self.codec = codec
+        self.bitrate = bitrate
+        self.frame_ms = frame_ms
+        self.sample_rate = sample_rate
+        self.process = None
+
+    def _command(self):
+        command = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            # Raw PCM needs no probing, and probing would hold back the first seconds of output
+            "-probesize", "32", "-analyzeduration", "0",
+            "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS), "-i", "pipe:0",
+        ]
+        if self.sample_rate != SAMPLE_RATE:
+            command += ["-ar", str(self.sample_rate)]
+        if self.codec == 'opus':
+            # Opus only takes 2.5-60 ms frames; one ogg page per frame keeps latency down
+            opus_frame_ms = min(60, max(20, self.frame_ms))
+            command += [
+                "-c:a", "libopus", "-b:a", str(self.bitrate), "-application", "voip",
+                "-frame_duration", str(opus_frame_ms), "-page_duration", str(opus_frame_ms * 1000),
+                "-f", "ogg",
+            ]
+        else:
+            command += ["-c:a", "flac", "-frame_size", str(SAMPLE_RATE * self.frame_ms // 1000), "-f", "flac"]
+        return command + ["-flush_packets", "1", "pipe:1"]
+
+    def open(self):
+        self.process = subprocess.Popen(
+            self._command(), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        os.set_blocking(self.process.stdout.fileno(), False)
+        return self
+
+    def _read_available(self):
+        chunks = []
+        fd = self.process.stdout.fileno()
+        while True:
+            try:
+                data = os.read(fd, 65536)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            chunks.append(data)
+        return b"".join(chunks)
+
+    def encode(self, pcm):
+        self.process.stdin.write(pcm)
+        self.process.stdin.flush()
+        return self._read_available()
+
+    def close(self):
+        """Finish the stream and return the encoder's trailing output"""
+        if not self.process:
+            return b""
+        process, self.process = self.process, None
+        try:
+            process.stdin.close()
+            os.set_blocking(process.stdout.fileno(), True)
+            tail = process.stdout.read()
+            process.wait(timeout=5)
+            return tail
+        except Exception as e:
+            print(f"Error closing {self.codec} encoder: {e}")
+            process.kill()
+            return b""
+
+def validate_audio_options(options):
+    """Raise ValueError for audio options a streamer could not be built with"""
+    get_stream_profile(
+        options.get('profile') or os.getenv("AUDIO_STREAM_PROFILE", "balanced"),
+        options.get('frame_ms')
+    )
+    policy = options.get('overflow_policy') or os.getenv("AUDIO_OVERFLOW_POLICY", "drop-newest")
+    if policy not in OVERFLOW_POLICIES:
+        raise ValueError(f"Unknown overflow policy '{policy}', expected one of {', '.join(OVERFLOW_POLICIES)}")
+    recording = options.get('recording') or {}
+    if recording.get('format', 'wav') not in RECORDING_FORMATS:
+        raise ValueError(f"Unknown recording format '{recording['format']}', expected one of {', '.join(RECORDING_FORMATS)}")
+    codec = options.get('codec') or os.getenv("AUDIO_CODEC", "raw")
+    if codec not in AUDIO_CODECS:
+        raise ValueError(f"Unknown audio codec '{codec}', expected one of {', '.join(AUDIO_CODECS)}")
+    adaptive = str(options.get('adaptive', os.getenv("AUDIO_ADAPTIVE", "false"))).lower() in ('1', 'true', 'yes', 'on')
+    if adaptive and not any(tier['codec'] == codec for tier in QUALITY_TIERS):
+        raise ValueError(f"Audio codec '{codec}' has no adaptive quality tier, use 'raw' or 'opus' "
+                         f"with adaptive quality ({', '.join(tier['name'] for tier in QUALITY_TIERS)})")
+    gap_mode = options.get('gap_mode') or os.getenv("AUDIO_GAP_MODE", "pad")
+    if gap_mode not in GAP_MODES:
+        raise ValueError(f"Unknown gap mode '{gap_mode}', expected one of {', '.join(GAP_MODES)}")
+    protocol = options.get('protocol') or os.getenv("AUDIO_PROTOCOL", "auto")
+    if protocol not in AUDIO_PROTOCOLS:
+        raise ValueError(f"Unknown audio protocol '{protocol}', expected one of {', '.join(AUDIO_PROTOCOLS)}")
+    destination_mode = options.get('destination_mode') or os.getenv("AUDIO_DESTINATION_MODE", "failover")
+    if destination_mode not in DESTINATION_MODES:
+        raise ValueError(f"Unknown destination mode '{destination_mode}', expected one of {', '.join(DESTINATION_MODES)}")
+    # Same lookups as RealtimeAudioStreamer, so /start rejects what the bot thread would fail on after joining
+    positive_number(options.get('bitrate') or os.getenv("AUDIO_OPUS_BITRATE", "32000"), 'bitrate', integer=True)
+    positive_number(options.get('buffer_seconds') or os.getenv("AUDIO_BUFFER_SECONDS", "60"), 'buffer_seconds')
+    positive_number(options.get('drain_seconds', os.getenv("AUDIO_DRAIN_SECONDS", "10")), 'drain_seconds', allow_zero=True)
+    positive_number(options.get('failover_seconds') or os.getenv("AUDIO_FAILOVER_SECONDS", "3"), 'failover_seconds', allow_zero=True)
+    positive_number(
+        recording.get('segment_seconds') or os.getenv("AUDIO_RECORDING_SEGMENT_SECONDS", "300"), 'recording.segment_seconds'
+    )
+
+class AdaptiveQualityController:
+    """Steps between QUALITY_TIERS from send latency, write buffer, backlog and reconnects
+
+    Congestion has to last down_after seconds before stepping down a tier,
+    and a clear link up_after seconds before stepping back up, so the tier
+    does not flap. It never goes above the tier the session started on.
+    """
+
+    def __init__(self, tier=0, down_after=4, up_after=30, latency_ms=150, backlog_seconds=1.0, reconnect_window=60):
+        self.min_tier = tier
+        self.tier = tier
+        self.down_after = down_after
+        self.up_after = up_after
+        self.latency_ms = latency_ms
+        self.backlog_bytes = backlog_seconds * BYTES_PER_SECOND
+        self.reconnect_window = reconnect_window
+        self._send_times = deque(maxlen=50)
+        self._reconnects = deque()
+        self._congested_since = None
+        self._clear_since = None
+        self.switches = 0
+        self.last_reason = None
+
+    def record_send(self, seconds):
+        self._send_times.append(seconds)
+
+    def record_reconnect(self, now):
+        self._reconnects.append(now)
+
+    def _congestion(self, now, write_buffered, write_low, backlog):
+        reasons = []
+        if self._send_times:
+            ordered = sorted(self._send_times)
+            if ordered[int(0.9 * (len(ordered) - 1))] * 1000 > self.latency_ms:
+                reasons.append('send latency')
+        if write_buffered > write_low:
+            reasons.append('write buffer')
+        if backlog > self.backlog_bytes:
+            reasons.append('backlog')
+        while self._reconnects and now - self._reconnects[0] > self.reconnect_window:
+            self._reconnects.popleft()
+        if self._reconnects:
+            reasons.append('reconnects')
+        return reasons
+
+    def evaluate(self, now, write_buffered, write_low, backlog):
+        """Returns the tier to stream at from now on"""
+        reasons = self._congestion(now, write_buffered, write_low, backlog)
+        if reasons:
+            self._clear_since = None
+            if self._congested_since is None:
+                self._congested_since = now
+            if now - self._congested_since >= self.down_after and self.tier < len(QUALITY_TIERS) - 1:
+                self._step(self.tier + 1, ', '.join(reasons))
+                self._congested_since = now
+        else:
+            self._congested_since = None
+            if self._clear_since is None:
+                self._clear_since = now
+            if now - self._clear_since >= self.up_after and self.tier > self.min_tier:
+                self._step(self.tier - 1, 'link clear')
+                self._clear_since = now
+        return self.tier
+
+    def _step(self, tier, reason):
+        self.tier = tier
+        self.switches += 1
+        self.last_reason = reason
+        # Measurements taken at the old tier say little about the new one
+        self._send_times.clear()
+
+    def get_status(self):
+        return {
+            'tier': QUALITY_TIERS[self.tier]['name'],
+            'switches': self.switches,
+            'last_reason': self.last_reason,
+            'congested': self._congested_since is not None
+        }
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets from 0.1 ms to ~100 s, cheap to record into"""
+
+    def __init__(self, min_ms=0.1, growth=1.25, buckets=64):
+        self.bounds_ms = [min_ms * growth ** i for i in range(buckets)]
+        self.counts = [0] * (buckets + 1)
+        self.count = 0
+        self.max_ms = 0.0
+
+    def record(self, seconds):
+        value_ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.bounds_ms, value_ms)] += 1
+        self.count += 1
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples"""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return round(self.bounds_ms[index], 3) if index < len(self.bounds_ms) else round(self.max_ms, 3)
+        return round(self.max_ms, 3)
+
+    def get_status(self):
+        return {
+            'count': self.count,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 3)
+        }
+
+class CaptureTimeline:
+    """Lines captured audio up against the wall clock to find capture gaps
+
+    Each read's lateness is its capture time minus the stream time of its
+    last byte. A backlog drained after a scheduler hiccup is late only
+    briefly, while lost audio leaves every later read late by the same
+    amount, so lateness above the floor has to persist for confirm_ms
+    before it counts as a gap. In 'pad' mode the ring holds back audio
+    captured while a gap is suspected, so the silence lands exactly where
+    the gap started; in 'flag' mode the gap is only reported.
+    """
+
+    def __init__(self, mode='pad', threshold_ms=200, confirm_ms=500):
+        self.mode = mode
+        self.threshold = threshold_ms / 1000
+        self.confirm = confirm_ms / 1000
+        self._captured = 0
+        # Bytes of gaps accounted for so far, padded or flagged
+        self._offset = 0
+        self._first_lateness = None
+        self._floor = None
+        self._lateness = 0.0
+        self._origin = None
+        self._last_capture_at = None
+        # [stream position, time first seen, smallest excess lateness since]
+        self._suspect = None
+        self.hold_from = None
+        self.pending_pad = None
+        self._lock = threading.Lock()
+        # (stream position, gap bytes, bytes filled with silence, reason) for the sender to report
+        self.gaps = deque()
+        self.gap_count = 0
+        self.max_gap_bytes = 0
+        self.padded_bytes = 0
+        self.flagged_bytes = 0
+
+    def observe(self, position, count, captured_at, stored=True):
+        """Account for one capture read of count bytes written at stream position"""
+        if self._origin is None:
+            self._origin = captured_at - count / BYTES_PER_SECOND
+        self._captured += count
+        self._last_capture_at = captured_at
+        self._lateness = captured_at - self._origin - (self._captured + self._offset) / BYTES_PER_SECOND
+        if self._first_lateness is None:
+            self._first_lateness = self._lateness
+        if self._floor is None or self._lateness < self._floor:
+            self._floor = self._lateness
+        if not stored:
+            # The ring was full: the audio was captured, so the timeline holds, but the backend never gets it
+            self._add_gap(position, count, 0, 'overflow')
+
+        excess = self._lateness - self._floor
+        if self._suspect is None:
+            if excess > self.threshold:
+                self._suspect = [position, captured_at, excess]
+                if self.mode == 'pad':
+                    self.hold_from = position
+            return
+
+        self._suspect[2] = min(self._suspect[2], excess)
+        if self._suspect[2] <= self.threshold:
+            # Lateness came back down, so it was a backlog being drained rather than lost audio
+            self.cancel()
+        elif captured_at - self._suspect[1] >= self.confirm:
+            gap_position, _, excess = self._suspect
+            self.cancel()
+            gap_bytes = int(excess * BYTES_PER_SECOND)
+            gap_bytes -= gap_bytes % (SAMPLE_WIDTH * CHANNELS)
+            self._offset += gap_bytes
+            self.gap_count += 1
+            self.max_gap_bytes = max(self.max_gap_bytes, gap_bytes)
+            if self.mode == 'pad':
+                self.pending_pad = (gap_position, gap_bytes)
+            else:
+                self.flagged_bytes += gap_bytes
+                self._add_gap(gap_position, gap_bytes, 0, 'capture')
+
+    def padded(self, position, gap_bytes, filled):
+        """Record silence the ring inserted for a gap; anything it had no room for is flagged"""
+        self.pending_pad = None
+        self.padded_bytes += filled
+        self.flagged_bytes += gap_bytes - filled
+        self._add_gap(position, gap_bytes, filled, 'capture')
+
+    def cancel(self):
+        """Forget a suspected gap and stop holding audio back"""
+        self._suspect = None
+        self.hold_from = None
+
+    def _add_gap(self, position, gap_bytes, filled, reason):
+        with self._lock:
+            if self.gaps and reason == 'overflow' and self.gaps[-1][0] == position and self.gaps[-1][3] == reason:
+                # Consecutive overflow drops all sit at the same stream position
+                gap_bytes += self.gaps.pop()[1]
+            self.gaps.append((position, gap_bytes, filled, reason))
+
+    def take_gaps(self, end_position):
+        """Gaps that start before end_position, oldest first"""
+        with self._lock:
+            taken = []
+            while self.gaps and self.gaps[0][0] < end_position:
+                taken.append(self.gaps.popleft())
+            return taken
+
+    def get_status(self):
+        elapsed = self._last_capture_at - self._origin if self._origin is not None else 0
+        drift = self._lateness - self._first_lateness if self._first_lateness is not None else 0.0
+        return {
+            'mode': self.mode,
+            'gaps': self.gap_count,
+            'max_gap_ms': self.max_gap_bytes * 1000 // BYTES_PER_SECOND,
+            'padded_ms': self.padded_bytes * 1000 // BYTES_PER_SECOND,
+            'flagged_ms': self.flagged_bytes * 1000 // BYTES_PER_SECOND,
+            'lag_ms': round((self._lateness - self._floor) * 1000, 1) if self._floor is not None else 0.0,
+            'drift_ms': round(drift * 1000, 1),
+            'drift_ppm': round(drift / elapsed * 1e6, 1) if elapsed > 0 else 0.0,
+            'suspected_gap': self._suspect is not None
+        }
+
+class AudioRingBuffer:
+    """Fixed-capacity byte ring between the capture and sender threads
+
+    Bytes move through three cursors: written by capture, sent by the
+    sender, and released once the backend has acknowledged them. Sent but
+    unacknowledged bytes keep their space so they can be replayed. With a
+    CaptureTimeline, capture may write past the point the sender can see
+    while a gap is suspected, so silence can still be inserted before it.
+    """
+
+    def __init__(self, capacity, timeline=None):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._scratch = bytearray(4096)
+        self._read_total = 0
+        self._send_total = 0
+        self._write_total = 0
+        # Written by capture; _write_total trails it while the timeline holds audio back
+        self._fill_total = 0
+        self._cond = threading.Condition()
+        self.timeline = timeline
+        self.dropped_bytes = 0
+        self.released_unacked_bytes = 0
+        # Audio that left the last fill_from, in stream order: newly visible to the sender, or dropped
+        self.last_written = []
+        # Stream position of last_written, None when the ring was full and it was dropped
+        self.last_written_position = None
+        # (stream position after a capture read, monotonic time of that read)
+        self._stamps = deque()
+        # Bumped when the watchdog replaces a stuck capture worker; fills tagged with an older one are discarded
+        self.writer_generation = 0
+
+    @property
+    def sent_total(self):
+        return self._send_total
+
+    def available(self):
+        """Bytes captured but not sent yet"""
+        with self._cond:
+            return self._write_total - self._send_total
+
+    def unacked(self):
+        """Bytes sent but not acknowledged yet"""
+        with self._cond:
+            return self._send_total - self._read_total
+
+    def occupancy(self):
+        """Bytes holding ring space, sent or not"""
+        with self._cond:
+            return self._write_total - self._read_total
+
+    def fill_from(self, reader, max_bytes, generation=None):
+        """readinto() the next contiguous free region, returns bytes captured
+
+        A read tagged with a generation older than writer_generation is
+        discarded when it returns, so a replaced worker whose read was stuck
+        cannot move the cursors or last_written under its replacement.
+        """
+        with self._cond:
+            if self._stale(generation):
+                return 0
+            free = self.capacity - (self._fill_total - self._read_total)
+            if free < max_bytes and self._send_total > self._read_total:
+                # Sent audio only loses its replay safety net, so give it up before fresh audio
+                released = min(max_bytes - free, self._send_total - self._read_total)
+                self._read_total += released
+                self.released_unacked_bytes += released
+                free += released
+            position = self._fill_total
+            offset = position % self.capacity
+
+        size = min(max_bytes, free, self.capacity - offset)
+        if size <= 0:
+            # Full: keep draining the source so capture never stalls, but discard the audio
+            size = min(max_bytes, len(self._scratch))
+            count = reader.readinto(memoryview(self._scratch)[:size])
+            with self._cond:
+                if self._stale(generation):
+                    return 0
+                self.last_written = [memoryview(self._scratch)[:count]]
+                self.last_written_position = None
+                self.dropped_bytes += count
+                if count and self.timeline:
+                    self.timeline.observe(position, count, time.monotonic(), stored=False)
+            return count
+
+        count = reader.readinto(self._view[offset:offset + size])
+        with self._cond:
+            if self._stale(generation):
+                return 0
+            self.last_written = []
+            if not count:
+                return count
+            captured_at = time.monotonic()
+            self._fill_total += count
+            if self.timeline:
+                self.timeline.observe(position, count, captured_at)
+                if self.timeline.pending_pad:
+                    gap_position, gap_bytes = self.timeline.pending_pad
+                    self.timeline.padded(gap_position, gap_bytes, self._insert_silence(gap_position, gap_bytes))
+            self._publish(captured_at)
+        return count
+
+    def _stale(self, generation):
+        return generation is not None and generation != self.writer_generation
+
+    def _insert_silence(self, position, count):
+        """Shift held audio from position onwards and zero-fill the space, returns bytes inserted"""
+        with self._cond:
+            free = self.capacity - (self._fill_total - self._read_total)
+        count = min(count, free)
+        count -= count % (SAMPLE_WIDTH * CHANNELS)
+        if count <= 0 or position < self._write_total:
+            return 0
+        held = self._copy_out(position, self._fill_total)
+        self._copy_in(position, bytes(count))
+        self._copy_in(position + count, held)
+        self._fill_total += count
+        return count
+
+    def _publish(self, captured_at):
+        """Make filled audio visible to the sender, except what the timeline is holding back"""
+        hold_from = self.timeline.hold_from if self.timeline else None
+        end = self._fill_total if hold_from is None else min(hold_from, self._fill_total)
+        if end <= self._write_total:
+            return
+        self.last_written = self._regions(self._write_total, end)
+        self.last_written_position = self._write_total
+        with self._cond:
+            self._write_total = end
+            self._stamps.append((end, captured_at))
+            self._cond.notify_all()
+
+    def flush(self):
+        """Publish audio held back for a suspected gap, e.g. when capture ends"""
+        if self.timeline:
+            self.timeline.cancel()
+        self._publish(time.monotonic())
+
+    def _regions(self, start, end):
+        """Views covering stream positions start..end, split where the ring wraps"""
+        regions = []
+        while start < end:
+            offset = start % self.capacity
+            size = min(end - start, self.capacity - offset)
+            regions.append(self._view[offset:offset + size])
+            start += size
+        return regions
+
+    def _copy_out(self, start, end):
+        return b''.join(bytes(region) for region in self._regions(start, end))
+
+    def _copy_in(self, start, data):
+        done = 0
+        for region in self._regions(start, start + len(data)):
+            region[:] = data[done:done + len(region)]
+            done += len(region)
+
+    def capture_time(self, position):
+        """Monotonic time at which the byte at the given stream position was captured"""
+        with self._cond:
+            while self._stamps and self._stamps[0][0] <= position:
+                self._stamps.popleft()
+            return self._stamps[0][1] if self._stamps else None
+
+    def wait_readable(self, min_bytes, timeout=None):
+        """Block until min_bytes are waiting to be sent, returns bytes available"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._write_total - self._send_total >= min_bytes, timeout)
+            return self._write_total - self._send_total
+
+    def peek(self, max_bytes, scratch=None):
+        """Memoryview of the oldest unsent bytes, valid until they are released
+
+        Without scratch the view stops at the end of the ring; with it, a
+        frame that wraps around is copied into scratch so it stays whole.
+        """
+        with self._cond:
+            offset = self._send_total % self.capacity
+            size = min(max_bytes, self._write_total - self._send_total)
+        head = min(size, self.capacity - offset)
+        if head == size or scratch is None:
+            return self._view[offset:offset + head]
+
+        scratch[:head] = self._view[offset:]
+        scratch[head:size] = self._view[:size - head]
+        return memoryview(scratch)[:size]
+
+    def mark_sent(self, count):
+        with self._cond:
+            self._send_total += min(count, self._write_total - self._send_total)
+
+    def ack(self, sent_total):
+        """Release everything sent up to the given sent_total"""
+        with self._cond:
+            self._read_total = max(self._read_total, min(sent_total, self._send_total))
+            self._cond.notify_all()
+
+    def rewind(self):
+        """Treat unacknowledged bytes as unsent again"""
+        with self._cond:
+            self._send_total = self._read_total
+
+    def drop_oldest(self, count):
+        """Release the oldest count bytes, returns how many of them were never sent"""
+        with self._cond:
+            count = min(count, self._write_total - self._read_total)
+            unsent_before = self._write_total - self._send_total
+            self._read_total += count
+            self._send_total = max(self._send_total, self._read_total)
+            self._cond.notify_all()
+            return unsent_before - (self._write_total - self._send_total)
+
+    def consume(self, count):
+        """Drop count unsent bytes without sending them"""
+        with self._cond:
+            self._send_total += min(count, self._write_total - self._send_total)
+            self._read_total = self._send_total
+            self._cond.notify_all()
+
+    def clear(self):
+        if self.timeline:
+            self.timeline.cancel()
+        with self._cond:
+            self._read_total = self._send_total = self._write_total = self._fill_total
+            self._cond.notify_all()
+
+class ReplaySpool:
+    """Bounded store for audio that could not be sent, in memory first then on disk
+
+    When full, 'drop-oldest' discards the oldest spooled audio to make room;
+    any other policy keeps what is spooled and cuts new audio short.
+    """
+
+    def __init__(self, max_bytes, memory_bytes, spool_dir=None, policy='drop-newest'):
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.memory_bytes = memory_bytes if spool_dir else max_bytes
+        self.spool_dir = spool_dir
+        self._chunks = deque()
+        self._memory_used = 0
+        self._file = None
+        self._file_read = 0
+        self._file_write = 0
+        self.lost_bytes = 0
+        # (spooled byte count where a contiguous run starts, its stream position)
+        self._runs = deque()
+        self._appended = 0
+        self._consumed = 0
+        self._next_position = None
+
+    def size(self):
+        return self._memory_used + self._file_write - self._file_read
+
+    def append(self, data, position=None):
+        """Spool a copy of data, dropping whatever does not fit under max_bytes as the policy says"""
+        if self.policy == 'drop-oldest':
+            skip = max(0, len(data) - self.max_bytes)
+            skip += skip % SAMPLE_WIDTH
+            if skip:
+                self.lost_bytes += skip
+                data = data[skip:]
+                if position is not None:
+                    position += skip
+            self._drop_oldest(self.size() + len(data) - self.max_bytes)
+        keep = min(len(data), self.max_bytes - self.size())
+        keep -= keep % SAMPLE_WIDTH
+        self.lost_bytes += len(data) - keep
+        if keep <= 0:
+            return
+        if position is not None:
+            if position != self._next_position:
+                self._runs.append((self._appended, position))
+            self._next_position = position + keep
+        self._appended += keep
+
+        # Once audio has gone to disk, newer audio must follow it there to keep the order
+        if self._file_write == self._file_read and self._memory_used + keep <= self.memory_bytes:
+            self._chunks.append(bytes(data[:keep]))
+            self._memory_used += keep
+            return
+
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(dir=self.spool_dir, prefix="gmeet-spool-")
+        self._file.seek(self._file_write)
+        self._file.write(data[:keep])
+        self._file_write += keep
+
+    def head_position(self):
+        """Stream position of the oldest spooled byte, None if appended without positions"""
+        while len(self._runs) > 1 and self._runs[1][0] <= self._consumed:
+            self._runs.popleft()
+        if not self._runs:
+            return None
+        start, position = self._runs[0]
+        return position + self._consumed - start
+
+    def peek(self, max_bytes):
+        """Oldest spooled audio, up to max_bytes and never across a break in positions"""
+        self.head_position()
+        if len(self._runs) > 1:
+            max_bytes = min(max_bytes, self._runs[1][0] - self._consumed)
+        if self._chunks:
+            return self._chunks[0][:max_bytes]
+        if self._file_write > self._file_read:
+            self._file.seek(self._file_read)
+            return self._file.read(min(max_bytes, self._file_write - self._file_read))
+        return b""
+
+    def consume(self, count):
+        self._consumed += count
+        if self._chunks:
+            head = self._chunks.popleft()
+            if count < len(head):
+                self._chunks.appendleft(head[count:])
+            self._memory_used -= min(count, len(head))
+            return
+        self._file_read += count
+        if self._file_read >= self._file_write:
+            self._file_read = self._file_write = 0
+            self._file.truncate(0)
+
+    def _drop_oldest(self, count):
+        """Discard up to count of the oldest spooled bytes, as if sent"""
+        while count > 0 and self.size():
+            head = len(self._chunks[0]) if self._chunks else self._file_write - self._file_read
+            step = min(count, head)
+            self.consume(step)
+            self.lost_bytes += step
+            count -= step
+
+    def clear(self):
+        self._chunks.clear()
+        self._memory_used = 0
+        self._runs.clear()
+        self._appended = self._consumed = 0
+        self._next_position = None
+        if self._file:
+            self._file.close()
+            self._file = None
+        self._file_read = self._file_write = 0
+
+class VoiceActivityGate:
+    """Energy / zero-crossing gate that holds back frames without speech
+
+    Frames are split into short windows and analysed as NumPy int16 views.
+    Speech keeps the gate open for hangover_ms, and the last pre_roll_ms
+    of silence is sent ahead of speech so word onsets are not clipped.
+    Everything else is reported as silence durations instead of audio.
+    """
+
+    def __init__(self, threshold_db=-45.0, hangover_ms=300, pre_roll_ms=200, window_ms=20, report_ms=1000):
+        self.threshold_db = threshold_db
+        self.hangover_ms = hangover_ms
+        self.pre_roll_ms = pre_roll_ms
+        self.window_samples = SAMPLE_RATE * window_ms // 1000
+        self.report_ms = report_ms
+        self._hangover_left = 0
+        self._pre_roll = deque()
+        self._pre_roll_ms = 0
+        self._pending_silence_ms = 0
+        self.speech_ms = 0
+        self.silence_ms = 0
+        self.suppressed_bytes = 0
+
+    def is_speech(self, frame):
+        samples = np.frombuffer(frame, dtype='<i2')
+        if len(samples) < 2:
+            return False
+        windows = len(samples) // self.window_samples
+        if windows == 0:
+            windows, width = 1, len(samples)
+        else:
+            width = self.window_samples
+        view = samples[:windows * width].reshape(windows, width).astype(np.float32)
+
+        rms = np.sqrt(np.mean(view * view, axis=1)) / 32768.0
+        level_db = 20 * np.log10(np.maximum(rms, 1e-9))
+        crossings = np.mean(np.signbit(view[:, 1:]) != np.signbit(view[:, :-1]), axis=1)
+
+        # Loud windows are speech; slightly quieter ones only if they look voiced rather than hiss
+        voiced = (level_db >= self.threshold_db) | ((level_db >= self.threshold_db - 6) & (crossings < 0.25))
+        return bool(voiced.any())
+
+    def process(self, frame):
+        """Returns (silence_ms to report, frames to send) for one captured frame"""
+        frame_ms = len(frame) * 1000 // BYTES_PER_SECOND
+        if self.is_speech(frame):
+            self._hangover_left = self.hangover_ms
+        elif self._hangover_left > 0:
+            self._hangover_left -= frame_ms
+        else:
+            self._pre_roll.append(bytes(frame))
+            self._pre_roll_ms += frame_ms
+            while self._pre_roll_ms > self.pre_roll_ms:
+                dropped = self._pre_roll.popleft()
+                dropped_ms = len(dropped) * 1000 // BYTES_PER_SECOND
+                self._pre_roll_ms -= dropped_ms
+                self._pending_silence_ms += dropped_ms
+                self.silence_ms += dropped_ms
+                self.suppressed_bytes += len(dropped)
+            if self._pending_silence_ms >= self.report_ms:
+                return self._take_silence(), []
+            return 0, []
+
+        frames = list(self._pre_roll) + [frame]
+        self.speech_ms += frame_ms + self._pre_roll_ms
+        self._pre_roll.clear()
+        self._pre_roll_ms = 0
+        return self._take_silence(), frames
+
+    def _take_silence(self):
+        silence_ms, self._pending_silence_ms = self._pending_silence_ms, 0
+        return silence_ms
+
+    def flush(self):
+        """Silence still held back at the end of the stream, pre-roll included, in ms"""
+        for frame in self._pre_roll:
+            self.suppressed_bytes += len(frame)
+        self._pending_silence_ms += self._pre_roll_ms
+        self.silence_ms += self._pre_roll_ms
+        self._pre_roll.clear()
+        self._pre_roll_ms = 0
+        return self._take_silence()
+
+    def get_status(self):
+        return {
+            'speech_ms': self.speech_ms,
+            'silence_ms': self.silence_ms,
+            'suppressed_bytes': self.suppressed_bytes
+        }
+
+FANOUT_SLOW_POLICIES = ('skip', 'drop')
+
+class AudioFanout:
+    """Broadcast ring that any number of local subscribers read from at their own pace
+
+    Captured audio is stored once; each subscriber only keeps a cursor
+    into the ring and is handed memoryview slices of it, valid until the
+    writer laps them. The writer never waits: a subscriber that falls more
+    than the ring's capacity behind, or was still holding a slice when it
+    was overwritten, either skips ahead to live audio ('skip') or is
+    disconnected ('drop'), without affecting anyone else.
+    """
+
+    def __init__(self, capacity, slow_policy='skip'):
+        self.capacity = capacity
+        self.slow_policy = slow_policy
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._write_total = 0
+        self._cond = threading.Condition()
+        self._subscribers = set()
+        self.closed = False
+        self.subscribers_served = 0
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    def write(self, data):
+        with self._cond:
+            if not self._subscribers:
+                return
+            data = memoryview(data)
+            if len(data) > self.capacity:
+                # Only the newest capacity bytes fit; the rest still counts, so readers see it as a gap
+                self._write_total += len(data) - self.capacity
+                data = data[-self.capacity:]
+            offset = self._write_total % self.capacity
+            head = min(len(data), self.capacity - offset)
+            self._view[offset:offset + head] = data[:head]
+            self._view[:len(data) - head] = data[head:]
+            self._write_total += len(data)
+            self._cond.notify_all()
+
+    def subscribe(self):
+        with self._cond:
+            subscriber = FanoutSubscriber(self, self._write_total)
+            self._subscribers.add(subscriber)
+            self.subscribers_served += 1
+            return subscriber
+
+    def _read(self, subscriber, max_bytes, timeout):
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self.closed or subscriber.closed or self._write_total > subscriber.position, timeout
+            )
+            if self.closed or subscriber.closed:
+                return None
+            behind = self._write_total - subscriber.position
+            lent, subscriber.lent_from = subscriber.lent_from, None
+            if behind > self.capacity or (lent is not None and self._write_total - lent > self.capacity):
+                if self.slow_policy == 'drop':
+                    print(f"Dropping slow audio subscriber {subscriber.subscriber_id}")
+                    subscriber.closed = True
+                    return None
+                subscriber.skipped_bytes += behind
+                subscriber.position = self._write_total
+                return b""
+            if not behind:
+                return b""
+            offset = subscriber.position % self.capacity
+            size = min(behind, max_bytes, self.capacity - offset)
+            subscriber.lent_from = subscriber.position
+            subscriber.position += size
+            return self._view[offset:offset + size]
+
+    def _unsubscribe(self, subscriber):
+        with self._cond:
+            subscriber.closed = True
+            self._subscribers.discard(subscriber)
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def get_status(self):
+        with self._cond:
+            return {
+                'subscribers': [s.get_status(self._write_total) for s in self._subscribers],
+                'subscribers_served': self.subscribers_served,
+                'capacity_seconds': self.capacity / BYTES_PER_SECOND,
+                'slow_policy': self.slow_policy
+            }
+
+class FanoutSubscriber:
+    _ids = itertools.count(1)
+
+    def __init__(self, fanout, position):
+        self.fanout = fanout
+        self.subscriber_id = next(self._ids)
+        self.position = position
+        # Stream position of the slice handed out by the last read
+        self.lent_from = None
+        self.skipped_bytes = 0
+        self.closed = False
+
+    def read(self, max_bytes=65536, timeout=1.0):
+        """Next audio for this subscriber: a memoryview of the ring, valid until the next read,
+        b"" if nothing arrived in time, None once it is over"""
+        return self.fanout._read(self, max_bytes, timeout)
+
+    def close(self):
+        self.fanout._unsubscribe(self)
+
+    def get_status(self, write_total):
+        return {
+            'id': self.subscriber_id,
+            'lag_ms': (write_total - self.position) * 1000 // BYTES_PER_SECOND,
+            'skipped_ms': self.skipped_bytes * 1000 // BYTES_PER_SECOND
+        }
+
+RECORDING_FORMATS = ('wav', 'flac')
+
+class SegmentRecorder:
+    """Tee captured audio into rotating WAV/FLAC segment files
+
+    write() only appends to an in-memory buffer; a writer thread flushes
+    it in large writes and fsyncs each segment when it is closed, so the
+    capture path never waits on the disk.
+    """
+
+    def __init__(self, directory, session_name, segment_seconds=300, fmt='wav',
+                 flush_bytes=256 * 1024, max_pending_seconds=30):
+        self.directory = directory
+        self.session_name = session_name
+        self.segment_bytes = int(segment_seconds * BYTES_PER_SECOND)
+        self.format = fmt
+        self.flush_bytes = flush_bytes
+        self.max_pending_bytes = int(max_pending_seconds * BYTES_PER_SECOND)
+        self._pending = bytearray()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self._segment = None
+        self._segment_written = 0
+        self._segment_index = 0
+        self.files = []
+        self.bytes_written = 0
+        self.dropped_bytes = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True, name="SegmentRecorderThread")
+        self._thread.start()
+        print(f"Recording {self.format} segments to {self.directory}")
+
+    def write(self, data):
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._pending) + len(data) > self.max_pending_bytes:
+                self.dropped_bytes += len(data)
+                return
+            self._pending += data
+            if len(self._pending) >= self.flush_bytes:
+                self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=10)
+
+    def _writer_loop(self):
+        flushing = bytearray()
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or len(self._pending) >= self.flush_bytes, timeout=1.0)
+                # Swap buffers so capture keeps appending while this thread writes
+                flushing, self._pending = self._pending, flushing
+                closed = self._closed
+            try:
+                self._write_segments(memoryview(flushing))
+            except Exception as e:
+                print(f"Recording write error: {e}")
+            flushing.clear()
+            if closed:
+                break
+        self._close_segment()
+
+    def _write_segments(self, data):
+        while len(data):
+            if self._segment is None:
+                self._open_segment()
+            size = min(len(data), self.segment_bytes - self._segment_written)
+            self._segment_write(data[:size])
+            self._segment_written += size
+            self.bytes_written += size
+            data = data[size:]
+            if self._segment_written >= self.segment_bytes:
+                self._close_segment()
+
+    def _open_segment(self):
+        self._segment_index += 1
+        path = os.path.join(self.directory, f"{self.session_name}_{self._segment_index:04d}.{self.format}")
+        if self.format == 'flac':
+            process = subprocess.Popen([
+                "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS), "-i", "pipe:0",
+                "-c:a", "flac", path
+            ], stdin=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=1024 * 1024)
+            self._segment = (path, process, None)
+        else:
+            handle = open(path, 'wb', buffering=1024 * 1024)
+            writer = wave.open(handle, 'wb')
+            writer.setnchannels(CHANNELS)
+            writer.setsampwidth(SAMPLE_WIDTH)
+            writer.setframerate(SAMPLE_RATE)
+            self._segment = (path, handle, writer)
+        self._segment_written = 0
+        self.files.append(path)
+
+    def _segment_write(self, data):
+        path, target, writer = self._segment
+        if writer:
+            writer.writeframesraw(data)
+        else:
+            target.stdin.write(data)
+
+    def _close_segment(self):
+        if self._segment is None:
+            return
+        path, target, writer = self._segment
+        self._segment = None
+        try:
+            if writer:
+                writer.close()
+                target.flush()
+                os.fsync(target.fileno())
+                target.close()
+            else:
+                target.stdin.close()
+                target.wait(timeout=30)
+                with open(path, 'rb') as segment:
+                    os.fsync(segment.fileno())
+            print(f"Recording segment saved: {path}")
+        except Exception as e:
+            print(f"Error closing recording segment {path}: {e}")
+
+    def get_status(self):
+        return {
+            'format': self.format,
+            'files': list(self.files),
+            'bytes_written': self.bytes_written,
+            'dropped_bytes': self.dropped_bytes
+        }
+
+def get_write_limits():
+    """(high, low) water marks in bytes for a websocket's transport write buffer"""
+    high = int(float(os.getenv("AUDIO_WRITE_HIGH_KB", "64")) * 1024)
+    low = int(float(os.getenv("AUDIO_WRITE_LOW_KB", "16")) * 1024)
+    return high, min(low, high)
+
+AUDIO_MUX_VERSION = 1
+# Channel id prefixed to every binary message on a multiplexed connection
+MUX_CHANNEL_HEADER = struct.Struct('!I')
+
+class AudioChannel:
+    """One session's slice of a shared audio websocket, used in place of the websocket itself
+
+    Belongs to the streamer's event loop. Everything that touches the
+    connection runs on the multiplexer's loop, so send() returns once the
+    message is queued there and only waits when the channel already has
+    window_bytes queued.
+    """
+
+    def __init__(self, connection, channel_id, loop, window_bytes):
+        self.connection = connection
+        self.channel_id = channel_id
+        self.loop = loop
+        self.window_bytes = window_bytes
+        self.state = websockets.protocol.State.OPEN
+        self._inbox = asyncio.Queue()
+        # Owned by the multiplexer's loop
+        self._queue = deque()
+        self._space = None
+        self.queued_bytes = 0
+        self.sent_bytes = 0
+        self.deficit = 0
+
+    @property
+    def closed(self):
+        return self.state != websockets.protocol.State.OPEN
+
+    async def _call(self, coro):
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.connection.loop))
+
+    async def send(self, message):
+        if self.closed:
+            raise websockets.exceptions.WebSocketException(f"audio channel {self.channel_id} is closed")
+        await self._call(self.connection.enqueue(self, message))
+
+    async def ping(self):
+        """Future resolved once the backend has read everything this channel sent before it"""
+        waiter = self.loop.create_future()
+        await self._call(self.connection.enqueue(self, None, waiter))
+        return waiter
+
+    async def recv(self):
+        message = await self._inbox.get()
+        if message is None:
+            self._inbox.put_nowait(None)
+            raise websockets.exceptions.WebSocketException(f"audio channel {self.channel_id} is closed")
+        return message
+
+    async def _messages(self):
+        while True:
+            message = await self._inbox.get()
+            if message is None:
+                self._inbox.put_nowait(None)
+                return
+            yield message
+
+    def __aiter__(self):
+        return self._messages()
+
+    async def close(self):
+        if self.closed:
+            return
+        self.state = websockets.protocol.State.CLOSED
+        await self._call(self.connection.close_channel(self))
+
+    def _on_loop(self, callback, *args):
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # The streamer's loop has already shut down
+            pass
+
+    def deliver(self, message):
+        self._on_loop(self._inbox.put_nowait, message)
+
+    def settle(self, waiter, error=None):
+        def _settle():
+            if waiter.done():
+                return
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
+        self._on_loop(_settle)
+
+    def connection_lost(self, error):
+        self.state = websockets.protocol.State.CLOSED
+        for _, waiter in self._queue:
+            if waiter:
+                self.settle(waiter, error)
+        self._queue.clear()
+        self.queued_bytes = 0
+        if self._space:
+            self._space.set()
+        self.deliver(None)
+
+    def get_status(self):
+        return {
+            'channel': self.channel_id,
+            'connection': self.connection.index,
+            'queued_bytes': self.queued_bytes,
+            'sent_bytes': self.sent_bytes,
+            'window_bytes': self.window_bytes
+        }
+
+class SharedAudioConnection:
+    """One backend websocket carrying many channels, written in deficit round robin
+
+    Text messages get a "channel" key, binary messages a 4-byte channel id
+    prefix. Each turn a channel may write up to quantum_bytes more than it
+    was owed, so a channel replaying a backlog cannot starve live ones.
+    Backend text messages with a "channel" key go to that channel, all
+    others to every channel.
+    """
+
+    def __init__(self, url, loop, index, quantum_bytes=16384):
+        self.url = url
+        self.loop = loop
+        self.index = index
+        self.quantum_bytes = quantum_bytes
+        self.websocket = None
+        self.channels = {}
+        self._ready = deque()
+        self._wake = None
+        self._connect_lock = None
+        self._tasks = []
+
+    async def _ensure_connected(self):
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+            self._wake = asyncio.Event()
+        async with self._connect_lock:
+            if self.websocket is not None:
+                return
+            await wait_for_connect_slot()
+            print(f"Opening shared audio WebSocket #{self.index}: {self.url}")
+            websocket = await websockets.connect(
+                self.url,
+                ping_interval=20,
+                ping_timeout=10,
+                close_timeout=5,
+                max_size=None,
+                write_limit=get_write_limits(),
+            )
+            await websocket.send(json.dumps({'type': 'mux', 'version': AUDIO_MUX_VERSION}))
+            self.websocket = websocket
+            self._tasks = [
+                asyncio.create_task(self._write_channels(websocket)),
+                asyncio.create_task(self._read_backend(websocket)),
+            ]
+
+    async def open_channel(self, channel):
+        await self._ensure_connected()
+        channel._space = asyncio.Event()
+        self.channels[channel.channel_id] = channel
+        await self.enqueue(channel, json.dumps({'type': 'channel_open'}))
+
+    async def close_channel(self, channel):
+        if self.channels.get(channel.channel_id) is channel:
+            self._push(channel, self._encode(channel, json.dumps({'type': 'channel_close'})), None)
+
+    def _encode(self, channel, message):
+        if isinstance(message, str):
+            payload = json.loads(message)
+            payload['channel'] = channel.channel_id
+            return json.dumps(payload)
+        return MUX_CHANNEL_HEADER.pack(channel.channel_id) + message
+
+    async def enqueue(self, channel, message, waiter=None):
+        """Queue a message (or, with message None, a ping) behind the channel's earlier ones"""
+        while channel.queued_bytes >= channel.window_bytes and not channel.closed:
+            channel._space.clear()
+            await channel._space.wait()
+        if self.channels.get(channel.channel_id) is not channel:
+            raise websockets.exceptions.WebSocketException(f"audio channel {channel.channel_id} is closed")
+        self._push(channel, None if message is None else self._encode(channel, message), waiter)
+
+    def _push(self, channel, data, waiter):
+        channel._queue.append((data, waiter))
+        if data is not None:
+            channel.queued_bytes += len(data)
+        if channel not in self._ready:
+            self._ready.append(channel)
+        self._wake.set()
+
+    async def _write_channels(self, websocket):
+        try:
+            while True:
+                if not self._ready:
+                    self._wake.clear()
+                    await self._wake.wait()
+                    continue
+                channel = self._ready.popleft()
+                channel.deficit += self.quantum_bytes
+                while channel._queue:
+                    data, waiter = channel._queue[0]
+                    if data is not None and len(data) > channel.deficit:
+                        break
+                    channel._queue.popleft()
+                    if data is None:
+                        # A pong proves the backend read everything written before the ping, this channel's included
+                        pong_waiter = await websocket.ping()
+                        pong_waiter.add_done_callback(functools.partial(self._settle_ping, channel, waiter))
+                        continue
+                    await websocket.send(data)
+                    channel.deficit -= len(data)
+                    channel.queued_bytes -= len(data)
+                    channel.sent_bytes += len(data)
+                    channel._space.set()
+                if channel._queue:
+                    self._ready.append(channel)
+                else:
+                    channel.deficit = 0
+                    if channel.closed and self.channels.get(channel.channel_id) is channel:
+                        del self.channels[channel.channel_id]
+        except Exception as e:
+            self._connection_lost(websocket, e)
+
+    @staticmethod
+    def _settle_ping(channel, waiter, pong_waiter):
+        if pong_waiter.cancelled():
+            channel.settle(waiter, websockets.exceptions.WebSocketException("ping cancelled"))
+        else:
+            channel.settle(waiter, pong_waiter.exception())
+
+    async def _read_backend(self, websocket):
+        error = None
+        try:
+            async for message in websocket:
+                if isinstance(message, str):
+                    try:
+                        channel_id = json.loads(message).get('channel')
+                    except (ValueError, AttributeError):
+                        channel_id = None
+                    if channel_id is None:
+                        for channel in list(self.channels.values()):
+                            channel.deliver(message)
+                    elif channel_id in self.channels:
+                        self.channels[channel_id].deliver(message)
+                elif len(message) >= MUX_CHANNEL_HEADER.size:
+                    channel = self.channels.get(MUX_CHANNEL_HEADER.unpack_from(message)[0])
+                    if channel:
+                        channel.deliver(message[MUX_CHANNEL_HEADER.size:])
+        except Exception as e:
+            error = e
+        self._connection_lost(websocket, error)
+
+    def _connection_lost(self, websocket, error):
+        if self.websocket is not websocket:
+            return
+        print(f"Shared audio WebSocket #{self.index} lost: {error}")
+        self.websocket = None
+        for task in self._tasks:
+            if task is not asyncio.current_task():
+                task.cancel()
+        error = websockets.exceptions.WebSocketException(f"shared audio connection lost: {error}")
+        for channel in list(self.channels.values()):
+            channel.connection_lost(error)
+        self.channels.clear()
+        self._ready.clear()
+        asyncio.ensure_future(websocket.close())
+
+class AudioMultiplexer:
+    """A small pool of shared websockets to one backend, driven by its own event loop thread"""
+
+    def __init__(self, url, connections=1, window_bytes=2 * BYTES_PER_SECOND):
+        self.url = url
+        self.window_bytes = window_bytes
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True, name="AudioMuxThread").start()
+        self.connections = [SharedAudioConnection(url, self.loop, index) for index in range(max(1, connections))]
+        self._channel_ids = itertools.count(1)
+
+    async def open_channel(self):
+        """Open a channel on the least busy connection, from the caller's event loop"""
+        connection = min(self.connections, key=lambda c: (c.websocket is None, len(c.channels)))
+        channel = AudioChannel(connection, next(self._channel_ids), asyncio.get_running_loop(), self.window_bytes)
+        await channel._call(connection.open_channel(channel))
+        return channel
+
+    def get_status(self):
+        return {
+            'url': self.url,
+            'connections': [
+                {'connected': c.websocket is not None, 'channels': len(c.channels)} for c in self.connections
+            ]
+        }
+
+audio_multiplexers = {}
+audio_multiplexers_lock = threading.Lock()
+
+def get_audio_multiplexer(url):
+    """Shared multiplexer for a backend websocket URL, created on first use"""
+    with audio_multiplexers_lock:
+        if url not in audio_multiplexers:
+            audio_multiplexers[url] = AudioMultiplexer(
+                url,
+                connections=int(os.getenv("AUDIO_MUX_CONNECTIONS", "1")),
+                window_bytes=int(float(os.getenv("AUDIO_MUX_WINDOW_SECONDS", "2")) * BYTES_PER_SECOND)
+            )
+        return audio_multiplexers[url]
+
+def backoff_delay(base, attempt, cap=60):
+    """Exponential backoff with equal jitter, so sessions that failed together retry apart"""
+    delay = min(base * (2 ** min(attempt, 10)), cap)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def get_retry_after(error, cap=300):
+    """Seconds from a Retry-After header on a rejected websocket handshake, 0 without one"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or getattr(error, 'headers', None)
+    value = headers.get('Retry-After') if headers else None
+    if not value:
+        return 0
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return 0
+    return max(0, min(seconds, cap))
+
+class ReconnectTokenBucket:
+    """Process-wide limit on new backend websockets, shared by every session
+
+    When a backend restarts, all bots lose their sockets at once; jitter
+    spreads their retries and the bucket caps how many this process opens
+    per second, so the backend's recovery does not depend on fleet size.
+    """
+
+    def __init__(self, rate=2.0, burst=5):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.delayed = 0
+        self.wait_seconds = 0.0
+
+    def reserve(self):
+        """Take a token, returns how long to wait before connecting"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Tokens go negative so callers queue up behind each other
+            self._tokens -= 1
+            self.granted += 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if wait:
+                self.delayed += 1
+                self.wait_seconds += wait
+            return wait
+
+    def get_status(self):
+        return {
+            'rate_per_second': self.rate,
+            'burst': self.burst,
+            'granted': self.granted,
+            'delayed': self.delayed,
+            'wait_seconds': round(self.wait_seconds, 3)
+        }
+
+reconnect_bucket = None
+reconnect_bucket_lock = threading.Lock()
+
+def get_reconnect_bucket():
+    global reconnect_bucket
+    with reconnect_bucket_lock:
+        if reconnect_bucket is None:
+            reconnect_bucket = ReconnectTokenBucket(
+                rate=float(os.getenv("AUDIO_RECONNECT_RATE", "2")),
+                burst=int(os.getenv("AUDIO_RECONNECT_BURST", "5"))
+            )
+        return reconnect_bucket
+
+async def wait_for_connect_slot():
+    """Sleep until the process-wide bucket allows another backend websocket"""
+    wait = get_reconnect_bucket().reserve()
+    if wait:
+        print(f"⏳ Waiting {wait:.1f}s for a reconnect slot")
+        await asyncio.sleep(wait)
+
+def get_destination_urls(backend_url, options):
+    """backend_url first, then AUDIO_DESTINATIONS, without duplicates"""
+    extra = options.get('destinations')
+    if extra is None:
+        extra = os.getenv("AUDIO_DESTINATIONS", "").split(',')
+    urls = []
+    for url in [backend_url] + list(extra):
+        url = url.strip().rstrip('/')
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+class AudioDestination:
+    """One backend the streamer can send to, with its own health and lag counters
+
+    In failover mode the active destination is the 'primary' and every
+    other one a 'standby' whose websocket is opened ahead of time and kept
+    alive by pings, so taking over costs only the stream handshake. In
+    mirror mode the others are 'mirror's, each fed every captured frame
+    through its own bounded queue so a slow or dead mirror never holds up
+    the primary; when the queue is full the oldest audio is shed.
+    """
+
+    def __init__(self, url, role, queue_bytes=0):
+        self.url = url
+        self.ws_url = url.replace('http', 'ws') + '/ws/audio'
+        self.role = role
+        self.websocket = None
+        self.reader = None
+        self.connects = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.down_since = None
+        self.retry_at = 0
+        self.retry_after_until = 0
+        self.queue_bytes = queue_bytes
+        self._queue = deque()
+        self._queued = 0
+        self._lock = threading.Lock()
+        self.sent_bytes = 0
+        self.lost_bytes = 0
+        self.frame_header = False
+        self.frames_sent = 0
+        self._next_position = None
+
+    def is_open(self):
+        websocket = self.websocket
+        if websocket is None:
+            return False
+        if hasattr(websocket, 'state'):
+            return websocket.state == websockets.protocol.State.OPEN
+        return not websocket.closed
+
+    def record_connect(self):
+        self.connects += 1
+        self.consecutive_failures = 0
+        self.down_since = None
+
+    def record_failure(self, error, retry_delay):
+        now = time.monotonic()
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = str(error)
+        if self.down_since is None:
+            self.down_since = now
+        retry_after = get_retry_after(error)
+        if retry_after:
+            print(f"Backend {self.url} asked to retry after {retry_after:.0f}s")
+            self.retry_after_until = now + retry_after
+        self.retry_at = max(now + backoff_delay(retry_delay, self.consecutive_failures - 1), self.retry_after_until)
+
+    async def detach(self):
+        """Hand over the websocket once the task draining it has stopped reading"""
+        websocket, self.websocket = self.websocket, None
+        reader, self.reader = self.reader, None
+        if reader:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+        return websocket
+
+    def offer(self, data, position, captured_at):
+        """Queue captured audio for a mirror"""
+        with self._lock:
+            self._queue.append((position, bytes(data), captured_at))
+            self._queued += len(data)
+            while self._queued > self.queue_bytes:
+                _, dropped, _ = self._queue.popleft()
+                self._queued -= len(dropped)
+                self.lost_bytes += len(dropped)
+
+    def take(self, max_bytes):
+        """Oldest queued audio, contiguous entries joined up to max_bytes, or None"""
+        with self._lock:
+            if not self._queue:
+                return None
+            position, data, captured_at = self._queue.popleft()
+            parts = [data]
+            size = len(data)
+            while self._queue and self._queue[0][0] == position + size and size + len(self._queue[0][1]) <= max_bytes:
+                size += len(self._queue[0][1])
+                parts.append(self._queue.popleft()[1])
+            self._queued -= size
+        return position, b''.join(parts), captured_at
+
+    def head_position(self):
+        with self._lock:
+            return self._queue[0][0] if self._queue else None
+
+    def put_back(self, position, data, captured_at):
+        """Return audio a failed send did not deliver to the front of the queue"""
+        with self._lock:
+            self._queue.appendleft((position, data, captured_at))
+            self._queued += len(data)
+
+    def pack_header(self, position, captured_at):
+        flags = 0
+        if self._next_position is not None and position != self._next_position:
+            flags |= FRAME_FLAG_DISCONTINUITY
+        header = pack_frame_header(flags, self.frames_sent, position, captured_at)
+        self.frames_sent += 1
+        return header
+
+    def get_status(self, connected=None, lag_bytes=None):
+        """The active destination's socket and lag belong to the streamer, which passes them in"""
+        if lag_bytes is None and self.role == 'mirror':
+            lag_bytes = self._queued
+        return {
+            'url': self.url,
+            'role': self.role,
+            'connected': self.is_open() if connected is None else connected,
+            'healthy': self.connects > 0 and self.down_since is None,
+            'lag_ms': lag_bytes * 1000 // BYTES_PER_SECOND if lag_bytes is not None else None,
+            'connects': self.connects,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'down_seconds': round(time.monotonic() - self.down_since, 1) if self.down_since is not None else 0,
+            'retry_after_seconds': round(max(0, self.retry_after_until - time.monotonic()), 1),
+            'sent_bytes': self.sent_bytes,
+            'lost_ms': self.lost_bytes * 1000 // BYTES_PER_SECOND
+        }
+
+class RealtimeAudioStreamer:
+    mode = 'threaded'
+
+    def __init__(self, backend_url, options=None, token=None, interview_id=None, session_id=None):
+        self.options = options or {}
+        self.backend_url = backend_url
+        self.token = token
+        self.interview_id = interview_id
+        self.session_id = session_id or uuid.uuid4().hex
+        self.protocol = self.options.get('protocol') or os.getenv("AUDIO_PROTOCOL", "auto")
+        self.multiplex = str(self.options.get('multiplex', os.getenv("AUDIO_MULTIPLEX", "false"))).lower() in ('1', 'true', 'yes', 'on')
+        self.frame_header = False
+        self.frames_sent = 0
+        self._next_frame_position = 0
+        self._sent_high_position = 0
+        self._pending_frame_flags = 0
+        self._backend_frame_ms = None
+        self._last_pcm_position = 0
+        self.destination_mode = self.options.get('destination_mode') or os.getenv("AUDIO_DESTINATION_MODE", "failover")
+        # The active destination gets this long to come back before the next one takes over
+        self.failover_seconds = positive_number(self.options.get('failover_seconds') or os.getenv("AUDIO_FAILOVER_SECONDS", "3"), 'failover_seconds', allow_zero=True)
+        mirror_queue_bytes = int(float(os.getenv("AUDIO_MIRROR_QUEUE_SECONDS", "30")) * BYTES_PER_SECOND)
+        standby_role = 'mirror' if self.destination_mode == 'mirror' else 'standby'
+        self.destinations = [
+            AudioDestination(url, 'primary' if i == 0 else standby_role, mirror_queue_bytes)
+            for i, url in enumerate(get_destination_urls(backend_url, self.options))
+        ]
+        self.active_destination = 0
+        self.failovers = 0
+        self._destination_tasks = []
+        self.ws_url = self.destinations[0].ws_url
+        self.websocket = None
         self.is_streaming = False
+        self.capture_backend = None
+        self.capture_backend_name = os.getenv("AUDIO_CAPTURE_BACKEND", "auto")
+        self.bytes_transmitted = 0
+        self.first_audio_at = None
+        self.last_activity_time = datetime.datetime.now()
+        self.is_connected = False
+        self.reconnect_attempts = 0
+        self.max_reconnect_attempts = 10
+        self.reconnect_delay = 5
+        self.profile = get_stream_profile(
+            self.options.get('profile') or os.getenv("AUDIO_STREAM_PROFILE", "balanced"),
+            self.options.get('frame_ms')
+        )
+        self.frame_bytes = ms_to_bytes(self.profile['frame_ms'])
+        self.min_frame_bytes = ms_to_bytes(self.profile['min_frame_ms'])
+        self.write_high_bytes, self.write_low_bytes = get_write_limits()
+        # On a backed-up link, up to this many frames go out as one message
+        self.max_coalesce_frames = max(1, int(os.getenv("AUDIO_MAX_COALESCE_FRAMES", "4")))
+        self.write_buffer_bytes = 0
+        self.max_write_buffer_bytes = 0
+        self.write_stalls = 0
+        self.write_stall_seconds = 0.0
+        self.coalesced_frames = 0
+        self._frame_scratch = bytearray(self.frame_bytes * self.max_coalesce_frames)
+        # Never read more than one frame per capture call, or small frames would wait on big reads
+        self.chunk_size = min(4096, self.frame_bytes)
+        self.overflow_policy = self.options.get('overflow_policy') or os.getenv("AUDIO_OVERFLOW_POLICY", "drop-newest")
+        buffer_seconds = positive_number(self.options.get('buffer_seconds') or os.getenv("AUDIO_BUFFER_SECONDS", "60"), 'buffer_seconds')
+        self.high_water_bytes = max(int(buffer_seconds * BYTES_PER_SECOND), 2 * self.frame_bytes)
+        self.low_water_bytes = self.high_water_bytes * 3 // 4
+        buffer_bytes = self.high_water_bytes
+        if self.overflow_policy != 'drop-newest':
+            # Headroom above the high-water mark so capture keeps writing while the sender sheds load
+            buffer_bytes += max(self.high_water_bytes // 4, 2 * self.frame_bytes)
+        buffer_chunks = -(-buffer_bytes // self.chunk_size)
+        self.gap_mode = self.options.get('gap_mode') or os.getenv("AUDIO_GAP_MODE", "pad")
+        self.timeline = None
+        if self.gap_mode != 'off':
+            self.timeline = CaptureTimeline(
+                self.gap_mode,
+                threshold_ms=float(os.getenv("AUDIO_GAP_THRESHOLD_MS", "200")),
+                confirm_ms=float(os.getenv("AUDIO_GAP_CONFIRM_MS", "500"))
+            )
+        self.audio_buffer = AudioRingBuffer(buffer_chunks * self.chunk_size, self.timeline)
+        spool_dir = os.getenv("AUDIO_SPOOL_DIR") or None
+        if self.overflow_policy == 'spill-to-disk' and not spool_dir:
+            spool_dir = tempfile.gettempdir()
+        spool_bytes = int(float(os.getenv("AUDIO_SPOOL_MAX_SECONDS", "600")) * BYTES_PER_SECOND)
+        if not spool_dir:
+            # Without a spool directory it all stays in memory, so hold no more than buffer_seconds
+            spool_bytes = min(spool_bytes, self.high_water_bytes)
+        self.spool = ReplaySpool(
+            spool_bytes,
+            int(float(os.getenv("AUDIO_SPOOL_MEMORY_SECONDS", "120")) * BYTES_PER_SECOND),
+            spool_dir,
+            self.overflow_policy
+        )
+        self.dropped_oldest_bytes = 0
+        self.spilled_bytes = 0
+        self.frame_capture_time = None
+        self.stall_timeout = float(os.getenv("AUDIO_STALL_TIMEOUT", "5"))
+        self.max_capture_failures = 5
+        self._capture_failures = 0
+        self._capture_generation = 0
+        self._capture_worker = None
+        self._restart_pending = False
+        self.capture_restarts = 0
+        self.capture_stalls = 0
+        self.capture_gap_seconds = 0.0
+        self._last_capture_at = time.monotonic()
+        self._stall_checked_at = self._last_capture_at
+        self._rate_samples = deque(maxlen=10)
+        self.queue_wait_histogram = LatencyHistogram()
+        self.send_histogram = LatencyHistogram()
+        self.codec = self.options.get('codec') or os.getenv("AUDIO_CODEC", "raw")
+        self.bitrate = positive_number(self.options.get('bitrate') or os.getenv("AUDIO_OPUS_BITRATE", "32000"), 'bitrate', integer=True)
+        self.output_sample_rate = SAMPLE_RATE
+        self.quality = None
+        self._quality_checked_at = 0
+        if str(self.options.get('adaptive', os.getenv("AUDIO_ADAPTIVE", "false"))).lower() in ('1', 'true', 'yes', 'on'):
+            start_tier = next((i for i, tier in enumerate(QUALITY_TIERS) if tier['codec'] == self.codec), 0)
+            self.quality = AdaptiveQualityController(
+                start_tier,
+                down_after=float(os.getenv("AUDIO_ADAPTIVE_DOWN_SECONDS", "4")),
+                up_after=float(os.getenv("AUDIO_ADAPTIVE_UP_SECONDS", "30")),
+                latency_ms=float(os.getenv("AUDIO_ADAPTIVE_LATENCY_MS", "150"))
+            )
+            self._apply_tier(QUALITY_TIERS[start_tier])
+        self.negotiation_timeout = float(os.getenv("AUDIO_NEGOTIATION_TIMEOUT", "1"))
+        self.encoder = None
+        self.recorder = None
+        recording = self.options.get('recording') or {}
+        if recording.get('enabled', os.getenv("AUDIO_RECORDING", "false").lower() == 'true'):
+            self.recorder = SegmentRecorder(
+                os.getenv("RECORDINGS_DIR", "recordings"),
+                datetime.datetime.now().strftime("meeting_%Y%m%d_%H%M%S"),
+                segment_seconds=positive_number(recording.get('segment_seconds') or os.getenv("AUDIO_RECORDING_SEGMENT_SECONDS", "300"), 'recording.segment_seconds'),
+                fmt=recording.get('format') or os.getenv("AUDIO_RECORDING_FORMAT", "wav")
+            )
+        self.vad_gate = None
+        if str(self.options.get('vad', os.getenv("AUDIO_VAD", "false"))).lower() in ('1', 'true', 'yes', 'on'):
+            if np is None:
+                print("Warning: numpy is not installed, voice activity gate disabled")
+            else:
+                self.vad_gate = VoiceActivityGate(
+                    threshold_db=float(os.getenv("AUDIO_VAD_THRESHOLD_DB", "-45")),
+                    hangover_ms=int(os.getenv("AUDIO_VAD_HANGOVER_MS", "300")),
+                    pre_roll_ms=int(os.getenv("AUDIO_VAD_PRE_ROLL_MS", "200"))
+                )
+        self.fanout = AudioFanout(
+            int(float(os.getenv("AUDIO_FANOUT_SECONDS", "10")) * BYTES_PER_SECOND),
+            os.getenv("AUDIO_FANOUT_SLOW_POLICY", "skip")
+        )
+        self.replay_speed = float(os.getenv("AUDIO_REPLAY_SPEED", "4"))
+        # On stop, buffered audio still goes out for up to this long; 0 stops at once
+        self.drain_seconds = positive_number(self.options.get('drain_seconds', os.getenv("AUDIO_DRAIN_SECONDS", "10")), 'drain_seconds', allow_zero=True)
+        self._drain_started = None
+        self._drain_deadline = None
+        self.drain_result = None
+        self._drained = threading.Event()
+        self.ack_interval = float(os.getenv("AUDIO_ACK_INTERVAL", "1"))
+        self._pending_acks = deque()
+        self._last_ack_ping = 0
+        self.replayed_bytes = 0
+        self._stop_event = threading.Event()
+        self._workers = []
+        
+    async def connect_websocket(self):
+        """Connect to backend WebSocket for audio streaming"""
+        destination = self.destinations[self.active_destination]
+        try:
+            if destination.is_open():
+                self.websocket = await destination.detach()
+                print(f"Taking over on hot standby {destination.url}")
+            else:
+                self.websocket = await self._open_websocket(self.ws_url)
+            await self._negotiate_stream()
+            # Keep reading so backend messages never stall pongs behind a full receive queue
+            asyncio.create_task(self._receive_backend_messages(self.websocket))
+            self.is_connected = True
+            self.reconnect_attempts = 0
+            destination.record_connect()
+            return True
+            
+        except Exception as e:
+            print(f"WebSocket connection failed: {e}")
+            self.is_connected = False
+            self.reconnect_attempts += 1
+            destination.record_failure(e, self.reconnect_delay)
+            return False
+
+    async def _open_websocket(self, ws_url):
+        if self.multiplex:
+            websocket = await get_audio_multiplexer(ws_url).open_channel()
+            print(f"Opened channel {websocket.channel_id} on shared audio WebSocket")
+            return websocket
+
+        await wait_for_connect_slot()
+        print(f"Connecting to audio WebSocket: {ws_url}")
+        websocket = await websockets.connect(
+            ws_url,
+            ping_interval=20,
+            ping_timeout=10,
+            close_timeout=5,
+            max_size=None,
+            write_limit=(self.write_high_bytes, self.write_low_bytes),
+        )
+        print("Connected to audio WebSocket")
+        return websocket
+
+    async def _connect_first_destination(self):
+        """Initial connection; in failover mode each destination is tried once in order"""
+        if await self.connect_websocket():
+            return True
+        if self.destination_mode == 'failover':
+            for _ in range(len(self.destinations) - 1):
+                self._fail_over()
+                if await self.connect_websocket():
+                    return True
+        return False
+
+    def _fail_over(self):
+        """Make the next destination active, preferring an open standby, then one not under Retry-After"""
+        count = len(self.destinations)
+        order = [(self.active_destination + i) % count for i in range(1, count)]
+        now = time.monotonic()
+        index = next((i for i in order if self.destinations[i].is_open()), None)
+        if index is None:
+            index = min(order, key=lambda i: max(0, self.destinations[i].retry_after_until - now))
+        previous, destination = self.destinations[self.active_destination], self.destinations[index]
+        print(f"⏭️ Failing over from {previous.url} to {destination.url}")
+        previous.role, destination.role = 'standby', 'primary'
+        self.active_destination = index
+        self.ws_url = destination.ws_url
+        self.failovers += 1
+
+    async def _maintain_destinations(self):
+        """Keep failover standbys connected, or feed mirrors, until streaming stops"""
+        if self.destination_mode == 'mirror':
+            mirrors = [d for d in self.destinations if d.role == 'mirror']
+            await asyncio.gather(*(self._run_mirror(d) for d in mirrors))
+            return
+        while self.is_streaming and not self._stop_event.is_set():
+            now = time.monotonic()
+            for destination in self.destinations:
+                if destination.role != 'standby' or destination.is_open() or now < destination.retry_at:
+                    continue
+                try:
+                    destination.websocket = await self._open_websocket(destination.ws_url)
+                    destination.reader = asyncio.create_task(self._discard_backend_messages(destination.websocket))
+                    destination.record_connect()
+                    print(f"Hot standby ready: {destination.url}")
+                except Exception as e:
+                    print(f"Standby {destination.url} unavailable: {e}")
+                    destination.record_failure(e, self.reconnect_delay)
+            await asyncio.sleep(1.0)
+
+    async def _run_mirror(self, destination):
+        """Send a mirror its queued audio, reconnecting with backoff while it is down"""
+        idle_wait = self.profile['frame_ms'] / 1000
+        while self._sending():
+            if not self.is_streaming and self.capture_backend is None and destination.head_position() is None:
+                await self._close_mirror(destination)
+                return
+            if not destination.is_open():
+                if time.monotonic() < destination.retry_at:
+                    await asyncio.sleep(0.5)
+                    continue
+                try:
+                    await self._open_mirror(destination)
+                except Exception as e:
+                    print(f"Mirror {destination.url} unavailable: {e}")
+                    destination.record_failure(e, self.reconnect_delay)
+                    continue
+
+            item = destination.take(self.frame_bytes * self.max_coalesce_frames)
+            if item is None:
+                await asyncio.sleep(idle_wait)
+                continue
+            position, data, captured_at = item
+            payload = destination.pack_header(position, captured_at) + data if destination.frame_header else data
+            try:
+                await destination.websocket.send(payload)
+            except websockets.exceptions.WebSocketException as e:
+                print(f"🔌 Mirror {destination.url} send error: {e}")
+                destination.put_back(position, data, captured_at)
+                destination.record_failure(e, self.reconnect_delay)
+                continue
+            destination._next_position = position + len(data)
+            destination.sent_bytes += len(data)
+
+    async def _open_mirror(self, destination):
+        """Connect a mirror and announce its stream; mirrors always get raw PCM"""
+        websocket = await self._open_websocket(destination.ws_url)
+        destination.frame_header = self.protocol == 'framed'
+        if self.protocol != 'legacy':
+            position = destination.head_position()
+            message = dict(self._start_message('raw'), role='mirror')
+            message['position'] = (position if position is not None else self.audio_buffer.sent_total) // (SAMPLE_WIDTH * CHANNELS)
+            message['seq'] = destination.frames_sent
+            await websocket.send(json.dumps(message))
+            try:
+                reply = json.loads(await asyncio.wait_for(websocket.recv(), self.negotiation_timeout))
+                if self.protocol == 'auto' and reply.get('type') == 'start_ack' and reply.get('frame_header') == AUDIO_PROTOCOL_VERSION:
+                    destination.frame_header = True
+            except asyncio.TimeoutError:
+                pass
+            except (ValueError, AttributeError) as e:
+                print(f"Ignoring unexpected negotiation reply: {e}")
+        destination.websocket = websocket
+        destination.reader = asyncio.create_task(self._discard_backend_messages(websocket))
+        destination.record_connect()
+        print(f"Mirroring audio to {destination.url}")
+
+    async def _close_mirror(self, destination):
+        """End a drained mirror's stream with the same marker the primary gets"""
+        websocket = await destination.detach()
+        if websocket is None:
+            return
+        try:
+            if self.protocol != 'legacy':
+                end = self._end_message(0)
+                end.update(position=(destination._next_position or 0) // (SAMPLE_WIDTH * CHANNELS), seq=destination.frames_sent)
+                await websocket.send(json.dumps(end))
+            await websocket.close()
+        except websockets.exceptions.WebSocketException as e:
+            print(f"Could not end the stream to {destination.url}: {e}")
+
+    async def _stop_destinations(self):
+        for task in self._destination_tasks:
+            task.cancel()
+        if self._destination_tasks:
+            await asyncio.gather(*self._destination_tasks, return_exceptions=True)
+        self._destination_tasks = []
+        for destination in self.destinations:
+            websocket = await destination.detach()
+            if websocket is not None:
+                try:
+                    await websocket.close()
+                except Exception as e:
+                    print(f"Error closing WebSocket to {destination.url}: {e}")
+
+    async def _negotiate_stream(self):
+        """Open the stream with a versioned handshake and let the backend pick framing and frame size
+
+        The start message carries the session (token, interview_id,
+        session_id), the sample format and the codec. The backend may answer
+        {"type": "start_ack", "frame_ms": N, "frame_header": 1}; without an
+        answer within the timeout the offer stands and, under the 'auto'
+        protocol, frames go out without headers. The legacy protocol sends
+        raw PCM with no announcement at all.
+        """
+        await self._close_encoder()
+        self.frame_header = self.protocol == 'framed'
+        if self.protocol == 'legacy' and self.codec == 'raw':
+            return
+
+        await self.websocket.send(json.dumps(self._start_message(self.codec)))
+        try:
+            reply = json.loads(await asyncio.wait_for(self.websocket.recv(), self.negotiation_timeout))
+            if reply.get('type') == 'start_ack':
+                if reply.get('frame_ms'):
+                    self._set_frame_ms(positive_number(reply['frame_ms'], 'frame_ms', integer=True))
+                    print(f"Backend negotiated {self.profile['frame_ms']} ms frames")
+                if self.protocol == 'auto' and reply.get('frame_header') == AUDIO_PROTOCOL_VERSION:
+                    self.frame_header = True
+        except asyncio.TimeoutError:
+            pass
+        except (ValueError, AttributeError) as e:
+            print(f"Ignoring unexpected negotiation reply: {e}")
+        if self.frame_header:
+            print(f"Sending framed audio (protocol v{AUDIO_PROTOCOL_VERSION})")
+
+        if self.codec == 'raw':
+            return
+        try:
+            self._open_encoder()
+        except Exception as e:
+            print(f"Could not start {self.codec} encoder, streaming raw PCM: {e}")
+            self._fall_back_to_raw()
+            await self.websocket.send(json.dumps(self._start_message('raw')))
+
+    def _open_encoder(self):
+        self.encoder = FfmpegAudioEncoder(
+            self.codec, self.bitrate, self.profile['frame_ms'], self.output_sample_rate
+        ).open()
+
+    def _fall_back_to_raw(self):
+        self.codec = 'raw'
+        self.output_sample_rate = SAMPLE_RATE
+        if self.quality:
+            self.quality.min_tier = self.quality.tier = 0
+
+    def _apply_tier(self, tier):
+        self.codec = tier['codec']
+        self.output_sample_rate = tier['sample_rate']
+        if tier['bitrate']:
+            self.bitrate = tier['bitrate']
+
+    async def _adapt_quality(self):
+        """Re-evaluate the quality tier about once a second and switch format in-band if it changed"""
+        now = time.monotonic()
+        if now - self._quality_checked_at < 1.0:
+            return
+        self._quality_checked_at = now
+        current = self.quality.tier
+        tier = self.quality.evaluate(now, self.write_buffer_bytes, self.write_low_bytes, self.audio_buffer.available())
+        if tier != current:
+            await self._switch_tier(QUALITY_TIERS[tier])
+
+    async def _switch_tier(self, tier):
+        """Change codec and rate mid-session; a format message precedes the first frame in the new format"""
+        print(f"🎚️ Switching audio quality to {tier['name']} ({self.quality.last_reason})")
+        await self._flush_encoder()
+        self._apply_tier(tier)
+        if not self._is_websocket_open():
+            # The next handshake announces the new format
+            return
+        if self.codec != 'raw':
+            try:
+                self._open_encoder()
+            except Exception as e:
+                print(f"Could not start {self.codec} encoder, streaming raw PCM: {e}")
+                self._fall_back_to_raw()
+        await self._announce_format()
+
+    async def _announce_format(self):
+        """Tell the backend a new encoded stream starts with the next frame"""
+        self._pending_frame_flags |= FRAME_FLAG_FORMAT_CHANGE
+        message = {
+            'type': 'format',
+            'codec': self.codec,
+            'bitrate': self.bitrate if self.codec == 'opus' else None,
+            'sample_rate': self.output_sample_rate,
+            'channels': CHANNELS,
+            'frame_ms': self.profile['frame_ms'],
+            'position': self._next_frame_position // (SAMPLE_WIDTH * CHANNELS),
+        }
+        if self.quality:
+            message['tier'] = QUALITY_TIERS[self.quality.tier]['name']
+        await self.websocket.send(json.dumps(message))
+
+    def _start_message(self, codec):
+        message = {
+            'type': 'start',
+            'codec': codec,
+            'bitrate': self.bitrate if codec == 'opus' else None,
+            'sample_rate': self.output_sample_rate if codec != 'raw' else SAMPLE_RATE,
+            'channels': CHANNELS,
+            'sample_format': 's16le',
+            'frame_ms': self.profile['frame_ms'],
+        }
+        if self.quality:
+            message['tier'] = QUALITY_TIERS[self.quality.tier]['name']
+        if self.protocol != 'legacy':
+            message.update({
+                'version': AUDIO_PROTOCOL_VERSION,
+                'session_id': self.session_id,
+                'token': self.token,
+                'interview_id': self.interview_id,
+                'frame_header': AUDIO_PROTOCOL_VERSION,
+                'frame_header_format': 'version:u8 flags:u8 header_size:u16 seq:u32 position_samples:u64 capture_time_us:u64',
+                'position': self._next_frame_position // (SAMPLE_WIDTH * CHANNELS),
+                # Sequence numbers continue across reconnects and failovers
+                'seq': self.frames_sent,
+            })
+        return message
+
+    async def _discard_backend_messages(self, websocket):
+        """Read and drop what a standby or mirror backend sends, so its pongs keep flowing"""
+        try:
+            async for message in websocket:
+                pass
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def _receive_backend_messages(self, websocket):
+        """Consume everything the backend sends on the audio socket"""
+        try:
+            async for message in websocket:
+                if isinstance(message, str):
+                    self._handle_backend_message(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    def _handle_backend_message(self, message):
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            return
+        if isinstance(payload, dict) and payload.get('type') == 'start_ack' and payload.get('frame_ms'):
+            try:
+                # Applied by the sender between frames, where the encoder can be restarted to match
+                self._backend_frame_ms = positive_number(payload['frame_ms'], 'frame_ms', integer=True)
+            except ValueError as e:
+                print(f"Ignoring backend frame size: {e}")
+
+    async def _apply_backend_frame_ms(self):
+        """Switch to the frame size the backend asked for, restarting the encoder so its framing matches"""
+        frame_ms, self._backend_frame_ms = self._backend_frame_ms, None
+        if frame_ms == self.profile['frame_ms']:
+            return
+        had_encoder = self.encoder is not None
+        await self._flush_encoder()
+        self._set_frame_ms(frame_ms)
+        print(f"Backend changed frame size to {frame_ms} ms")
+        if not had_encoder or not self._is_websocket_open():
+            return
+        try:
+            self._open_encoder()
+        except Exception as e:
+            print(f"Could not start {self.codec} encoder, streaming raw PCM: {e}")
+            self._fall_back_to_raw()
+        await self._announce_format()
+
+    def _set_frame_ms(self, frame_ms):
+        self.profile = dict(self.profile, frame_ms=frame_ms, min_frame_ms=min(self.profile['min_frame_ms'], frame_ms))
+        self.frame_bytes = ms_to_bytes(frame_ms)
+        self.min_frame_bytes = ms_to_bytes(self.profile['min_frame_ms'])
+        if len(self._frame_scratch) < self.frame_bytes * self.max_coalesce_frames:
+            self._frame_scratch = bytearray(self.frame_bytes * self.max_coalesce_frames)
+
+    async def _flush_encoder(self):
+        """Close the encoder and send what it still held, so no audio is lost at a format change"""
+        if not self.encoder:
+            return
+        header = b''
+        if self.frame_header:
+            header = self._pack_frame_header(self._last_pcm_position)
+        encoder, self.encoder = self.encoder, None
+        # Closing waits for ffmpeg to finish; off the loop, so capture and pings keep running meanwhile
+        tail = await asyncio.get_running_loop().run_in_executor(None, encoder.close)
+        if tail and self._is_websocket_open():
+            try:
+                await self.websocket.send(header + tail)
+            except websockets.exceptions.WebSocketException as e:
+                print(f"Could not send encoder tail: {e}")
+
+    async def _close_encoder(self):
+        encoder, self.encoder = self.encoder, None
+        if encoder:
+            await asyncio.get_running_loop().run_in_executor(None, encoder.close)
+
+    def _is_websocket_open(self):
+        """Check if WebSocket connection is open"""
+        if not self.websocket:
+            return False
+        
+        try:
+            if hasattr(self.websocket, 'state'):
+                return self.websocket.state == websockets.protocol.State.OPEN
+            elif hasattr(self.websocket, 'closed'):
+                return not self.websocket.closed
+            else:
+                return True
+        except Exception:
+            return False
+
+    def start_realtime_streaming(self, duration_minutes=60):
+        """Start real-time audio streaming to backend"""
+        if self.is_streaming:
+            print("Audio streaming already running")
+            return None
+
+        self.is_streaming = True
+        self._stop_event.clear()
+        self._last_capture_at = self._stall_checked_at = time.monotonic()
+        if self.recorder:
+            self.recorder.start()
+        
+        capture_thread = self._start_capture()
+        
+        sender_thread = threading.Thread(
+            target=self._run_websocket_sender,
+            daemon=True,
+            name="WebSocketSenderThread"
+        )
+        sender_thread.start()
+
+        watchdog_thread = threading.Thread(
+            target=self._run_watchdog,
+            daemon=True,
+            name="AudioWatchdogThread"
+        )
+        watchdog_thread.start()
+        
+        self._workers = [capture_thread, sender_thread, watchdog_thread]
+        return self._workers
+
+    async def wait_stopped(self, timeout=10):
+        """Wait for the capture and sender workers to finish"""
+        for thread in self._workers:
+            if thread.is_alive():
+                await asyncio.to_thread(thread.join, timeout)
+
+    def _start_capture(self):
+        """Start a capture worker; an earlier one exits as soon as its blocked read returns"""
+        self._capture_generation += 1
+        self.audio_buffer.writer_generation = self._capture_generation
+        self._capture_worker = threading.Thread(
+            target=self._capture_audio,
+            args=(self._capture_generation,),
+            daemon=True,
+            name="AudioCaptureThread"
+        )
+        self._capture_worker.start()
+        return self._capture_worker
+
+    def _capture_audio(self, generation=0):
+        """Capture system audio output (speakers), reopening the pipeline whenever it ends early"""
+        print("Starting system audio capture...")
+        while self.is_streaming and not self._stop_event.is_set() and generation == self._capture_generation:
+            captured_before = self.bytes_transmitted
+            self._setup_system_audio_capture(generation)
+            if generation != self._capture_generation or not self._should_restart_capture(captured_before):
+                break
+            self._stop_event.wait(min(self._restart_delay(), self.stall_timeout))
+
+    def _should_restart_capture(self, captured_before):
+        """Decide whether a capture pipeline that just ended gets reopened"""
+        if not self.is_streaming or self._stop_event.is_set():
+            return False
+        if self.bytes_transmitted == captured_before:
+            self._capture_failures += 1
+            if self._capture_failures >= self.max_capture_failures:
+                print("Audio capture keeps failing, giving up")
+                self.is_streaming = False
+                return False
+        else:
+            self._capture_failures = 0
+        self._restart_pending = True
+        print("🔁 Audio capture ended unexpectedly, reopening")
+        return True
+
+    def _restart_delay(self):
+        """Back off exponentially while reopened pipelines keep failing to produce audio"""
+        return min(2 ** self._capture_failures - 1, self.stall_timeout)
+
+    def _check_capture_health(self):
+        """Watchdog tick: sample the capture rate and abort a stalled pipeline"""
+        now = time.monotonic()
+        self._rate_samples.append((now, self.bytes_transmitted))
+        stalled_for = now - max(self._last_capture_at, self._stall_checked_at)
+        backend = self.capture_backend
+        if backend and stalled_for > self.stall_timeout:
+            self.capture_stalls += 1
+            self._stall_checked_at = now
+            backend.abort()
+            if backend.interruptible:
+                # The read fails, and the capture loop reopens the pipeline
+                print(f"⚠️ No audio captured for {stalled_for:.1f}s, aborting {backend.name} capture")
+                return
+            print(f"⚠️ No audio captured for {stalled_for:.1f}s, {backend.name} read is stuck; "
+                  f"leaving it behind and capturing with {SubprocessCaptureBackend.name}")
+            # parec-sox can be killed, so a later stall does not strand another thread
+            self.capture_backend_name = SubprocessCaptureBackend.name
+            self._restart_pending = True
+            stuck = self._capture_worker
+            replacement = self._start_capture()
+            self._workers = [replacement if worker is stuck else worker for worker in self._workers]
+
+    def capture_rate(self):
+        """Captured bytes per second over the watchdog's recent samples"""
+        if len(self._rate_samples) < 2:
+            return None
+        (start, start_bytes), (end, end_bytes) = self._rate_samples[0], self._rate_samples[-1]
+        return (end_bytes - start_bytes) / (end - start) if end > start else None
+
+    def _run_watchdog(self):
+        while self.is_streaming and not self._stop_event.wait(1.0):
+            self._check_capture_health()
+
+    def _setup_system_audio_capture(self, generation=None):
+        """Set up system audio capture using PulseAudio"""
+        print("Setting up system audio capture...")
+        
+        try:
+            self._setup_virtual_audio_sink()
+            
+            audio_source = "virtual_speaker.monitor"
+            
+            print(f"Capturing system audio from: {audio_source}")
+            self.capture_backend = open_capture_backend(audio_source, self.capture_backend_name, self.chunk_size)
+            self._read_audio_data(generation)
+            
+        except Exception as e:
+            print(f"System audio capture error: {e}")
+            self._fallback_audio_capture(generation)
+
+    def _setup_virtual_audio_sink(self):
+        """Create and setup virtual audio sink for system audio capture"""
+        try:
+            print("Setting up virtual audio sink...")
+            
+            result = subprocess.run(
+                ["pactl", "list", "short", "sinks"],
+                capture_output=True, text=True, check=True
+            )
+            
+            if "virtual_speaker" not in result.stdout:
+                print("Creating virtual audio sink...")
+                subprocess.run([
+                    "pactl", "load-module", "module-null-sink", 
+                    "sink_name=virtual_speaker", 
+                    "sink_properties=device.description=Virtual-Speaker-for-Recording"
+                ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                
+                subprocess.run([
+                    "pactl", "load-module", "module-loopback", 
+                    "source=@DEFAULT_MONITOR@", 
+                    "sink=virtual_speaker",
+                    "latency_msec=1"
+                ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                
+                print("Virtual audio sink created successfully")
+            else:
+                print("Virtual audio sink already exists")
+                
+            print("Available audio sources:")
+            subprocess.run(["pactl", "list", "short", "sources"], check=False)
+                
+        except Exception as e:
+            print(f"Warning: Could not setup virtual audio sink: {e}")
+
+    def _fallback_audio_capture(self, generation=None):
+        """Fallback method using default system audio monitor"""
+        try:
+            print("Using fallback system audio capture...")
+            
+            audio_source = "@DEFAULT_MONITOR@"
+
+            print(f"Fallback: Capturing from {audio_source}")
+            self.capture_backend = open_capture_backend(audio_source, self.capture_backend_name, self.chunk_size)
+            self._read_audio_data(generation)
+            
+        except Exception as e:
+            print(f"Fallback audio capture error: {e}")
+
+    def _read_audio_data(self, generation=None):
+        """Read audio data from the capture backend into the ring buffer"""
+        chunk_size = self.chunk_size
+        backend = self.capture_backend
+        
+        try:
+            while self.is_streaming and not self._stop_event.is_set() and backend and backend.is_alive():
+                try:
+                    count = self.audio_buffer.fill_from(backend, chunk_size, generation)
+                    if not count:
+                        time.sleep(0.05)
+                        continue
+                        
+                    self._on_audio_captured(count)
+                        
+                except Exception as e:
+                    print(f"Error reading audio data: {e}")
+                    break
+        finally:
+            self._cleanup_audio_capture(backend)
+
+    def _on_audio_captured(self, count):
+        """Bookkeeping for count bytes just written into the ring buffer"""
+        if self._restart_pending:
+            self._restart_pending = False
+            self.capture_restarts += 1
+            print(f"🔁 Audio capture restarted (restart #{self.capture_restarts})")
+        self.bytes_transmitted += count
+        self.last_activity_time = datetime.datetime.now()
+        now = time.monotonic()
+        gap = now - self._last_capture_at - count / BYTES_PER_SECOND
+        if gap > 0.5:
+            self.capture_gap_seconds += gap
+        self._last_capture_at = now
+        if self.recorder:
+            # Recorded even when the ring was full, so the archive keeps audio the backend missed
+            for region in self.audio_buffer.last_written:
+                self.recorder.write(region)
+        if self.fanout.subscribers:
+            for region in self.audio_buffer.last_written:
+                self.fanout.write(region)
+        position = self.audio_buffer.last_written_position
+        if self.destination_mode == 'mirror' and position is not None:
+            for region in self.audio_buffer.last_written:
+                for destination in self.destinations[1:]:
+                    destination.offer(region, position, now)
+                position += len(region)
+
+        if self.bytes_transmitted % (500 * 1024) < count:
+            print(f"📊 System audio captured: {self.bytes_transmitted / 1024:.2f} KB")
+
+    async def _wait_for_audio(self, min_bytes, timeout):
+        """Wait until min_bytes are ready to send without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.audio_buffer.wait_readable, min_bytes, timeout)
+
+    def _run_websocket_sender(self):
+        """Run WebSocket sender in a separate event loop"""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._websocket_sender_async())
+        finally:
+            loop.close()
+
+    async def _websocket_sender_async(self):
+        """Async WebSocket sender that reads from queue and sends to server"""
+        print("Starting WebSocket sender...")
+        
+        try:
+            if len(self.destinations) > 1:
+                self._destination_tasks.append(asyncio.create_task(self._maintain_destinations()))
+            connected = await self._connect_first_destination()
+            if not connected:
+                # Capture and recording carry on; audio spools until the backend can be reached
+                print("Failed initial WebSocket connection, retrying")
+                connected = await self._reconnect_websocket()
+                if not connected:
+                    print("Failed to reconnect WebSocket")
+
+            last_stats_time = datetime.datetime.now()
+            frame_wait = max(1.0, 2 * self.profile['frame_ms'] / 1000)
+            print(f"Streaming profile: {self.profile['name']} ({self.profile['frame_ms']} ms frames)")
+        
+            while connected and self._sending():
+                try:
+                    self._apply_overflow_policy()
+                    if self.quality:
+                        await self._adapt_quality()
+                    if self._backend_frame_ms is not None:
+                        await self._apply_backend_frame_ms()
+                        frame_wait = max(1.0, 2 * self.profile['frame_ms'] / 1000)
+                    if self.spool.size():
+                        # Spilled audio is older than anything in the ring, so it goes first
+                        if not await self._replay_spool():
+                            self.is_connected = False
+                            if not await self._reconnect_websocket():
+                                print("Failed to reconnect WebSocket")
+                                break
+                        continue
+
+                    if self.is_streaming:
+                        available = await self._wait_for_audio(self.frame_bytes, frame_wait)
+                    else:
+                        # Draining: whatever is left goes out, down to the last partial frame
+                        available = await self._wait_for_audio(1, 0.05)
+                        if not available and self.capture_backend is None:
+                            break
+                    if available < self.min_frame_bytes and (self.is_streaming or not available):
+                        if self._is_websocket_open():
+                            await self._track_acknowledgements()
+                        continue
+                    if not self._is_websocket_open():
+                        self.is_connected = False
+                        if not await self._reconnect_websocket():
+                            print("Failed to reconnect WebSocket")
+                            break
+                        continue
+
+                    if self._sample_write_buffer() >= self.write_high_bytes:
+                        await self._wait_for_write_drain()
+                        continue
+                    frame_size = self._next_frame_size(available)
+                    audio_data = self.audio_buffer.peek(frame_size, self._frame_scratch)
+
+                    try:
+                        send_started = time.monotonic()
+                        self.frame_capture_time = self.audio_buffer.capture_time(self.audio_buffer.sent_total)
+                        await self._report_gaps(self.audio_buffer.sent_total + len(audio_data))
+                        await self._send_audio_frame(audio_data, self.audio_buffer.sent_total)
+                        send_finished = time.monotonic()
+                        if self.frame_capture_time is not None:
+                            self.queue_wait_histogram.record(send_started - self.frame_capture_time)
+                        self.send_histogram.record(send_finished - send_started)
+                        if self.quality:
+                            self.quality.record_send(send_finished - send_started)
+                        self.audio_buffer.mark_sent(len(audio_data))
+                        await self._track_acknowledgements()
+
+                        current_time = datetime.datetime.now()
+                        if (current_time - last_stats_time).total_seconds() >= 30:
+                            kb_transmitted = self.bytes_transmitted / 1024
+                            buffered_kb = self.audio_buffer.available() / 1024
+                            print(f"📈 Streaming stats: {kb_transmitted:.2f} KB sent, buffered: {buffered_kb:.2f} KB")
+                            last_stats_time = current_time
+                        
+                    except (websockets.exceptions.ConnectionClosed, 
+                           websockets.exceptions.WebSocketException) as e:
+                        # The frame stays in the ring buffer and is spooled for replay
+                        print(f"🔌 WebSocket send error: {e}")
+                        self.is_connected = False
+                    
+                        if not await self._reconnect_websocket():
+                            print("Failed to reconnect WebSocket")
+                            break
+                
+                except Exception as e:
+                    print(f"WebSocket sender error: {e}")
+                    await asyncio.sleep(0.1)
+
+        finally:
+            try:
+                if self._drain_deadline is not None and not self._stop_event.is_set():
+                    await self._finish_drain()
+                await self._close_encoder()
+                await self._stop_destinations()
+            finally:
+                if self.drain_result is None:
+                    # Whatever ended the sender, /stop gets an answer rather than waiting out its timeout
+                    if not self._ever_connected():
+                        reason = 'never_connected'
+                    elif self.is_streaming:
+                        reason = 'sender_stopped'
+                    else:
+                        reason = 'not_drained'
+                    self.drain_result = self._undrained_result(reason)
+                if self.is_streaming:
+                    # Out of reconnects, but the meeting goes on: capture, recording and fan-out keep running
+                    print("⚠️ WebSocket sender gave up; capture and local recording continue until stop")
+                else:
+                    self._stop_event.set()
+                self._drained.set()
+                print("WebSocket sender stopped")
+
+    def _sending(self):
+        """True while streaming, and after a stop while the drain deadline has not passed"""
+        if self._stop_event.is_set():
+            return False
+        return self.is_streaming or (self._drain_deadline is not None and time.monotonic() < self._drain_deadline)
+
+    def _ever_connected(self):
+        return any(destination.connects for destination in self.destinations)
+
+    def _undrained_result(self, reason):
+        """drain_result for a stream that ended without reaching the end-of-stream handshake"""
+        return {
+            'complete': False,
+            'reason': reason,
+            'seconds': round(time.monotonic() - self._drain_started, 3) if self._drain_started else 0,
+            'unsent_ms': (self.audio_buffer.available() + self.spool.size()) * 1000 // BYTES_PER_SECOND,
+            'unacked_ms': self.audio_buffer.unacked() * 1000 // BYTES_PER_SECOND
+        }
+
+    def _end_message(self, unsent_bytes):
+        return {
+            'type': 'end',
+            'position': self._next_frame_position // (SAMPLE_WIDTH * CHANNELS),
+            'seq': self.frames_sent,
+            'unsent_ms': unsent_bytes * 1000 // BYTES_PER_SECOND
+        }
+
+    async def _finish_drain(self):
+        """Send the encoder tail and the end-of-stream marker, then wait for the backend to confirm it all"""
+        await self._flush_encoder()
+        unsent = self.audio_buffer.available() + self.spool.size()
+        confirmed = False
+        if self._is_websocket_open():
+            try:
+                silence_ms = self.vad_gate.flush() if self.vad_gate else 0
+                if silence_ms:
+                    # The receiver's timeline only adds up with the trailing silence in it
+                    await self.websocket.send(json.dumps({'type': 'silence', 'duration_ms': silence_ms}))
+                if self.protocol != 'legacy':
+                    await self.websocket.send(json.dumps(self._end_message(unsent)))
+                pong_waiter = await self.websocket.ping()
+                await asyncio.wait_for(pong_waiter, max(0.1, self._drain_deadline - time.monotonic()))
+                self.audio_buffer.ack(self.audio_buffer.sent_total)
+                confirmed = True
+                await self.websocket.close()
+            except (websockets.exceptions.WebSocketException, asyncio.TimeoutError) as e:
+                print(f"Could not confirm the end of the stream: {e}")
+        unacked = self.audio_buffer.unacked()
+        self.drain_result = {
+            'complete': confirmed and not unsent,
+            'seconds': round(time.monotonic() - self._drain_started, 3),
+            'unsent_ms': unsent * 1000 // BYTES_PER_SECOND,
+            'unacked_ms': unacked * 1000 // BYTES_PER_SECOND
+        }
+        if not self._ever_connected():
+            self.drain_result['reason'] = 'never_connected'
+        if self.drain_result['complete']:
+            print(f"✅ Drained all buffered audio in {self.drain_result['seconds']:.1f}s")
+        else:
+            print(f"⚠️ Drain incomplete after {self.drain_result['seconds']:.1f}s: "
+                  f"{self.drain_result['unsent_ms']} ms unsent, {self.drain_result['unacked_ms']} ms unconfirmed")
+        if self._destination_tasks:
+            # Mirrors flush their own queues against the same deadline
+            await asyncio.wait(self._destination_tasks, timeout=max(0, self._drain_deadline - time.monotonic()))
+
+    def _sample_write_buffer(self):
+        """Bytes written to the websocket but not yet handed to the network"""
+        websocket = self.websocket
+        if isinstance(websocket, AudioChannel):
+            buffered = websocket.queued_bytes
+        else:
+            transport = getattr(websocket, 'transport', None)
+            buffered = transport.get_write_buffer_size() if transport else 0
+        self.write_buffer_bytes = buffered
+        self.max_write_buffer_bytes = max(self.max_write_buffer_bytes, buffered)
+        return buffered
+
+    def _next_frame_size(self, available):
+        """One frame on a clear link; several coalesced into one message once the link or ring backs up"""
+        frame_size = self.frame_bytes
+        if self.write_buffer_bytes > self.write_low_bytes or available >= 2 * self.frame_bytes * self.max_coalesce_frames:
+            frame_size *= self.max_coalesce_frames
+        frame_size = min(available, frame_size)
+        if frame_size > self.frame_bytes:
+            self.coalesced_frames += -(-frame_size // self.frame_bytes) - 1
+        return frame_size - frame_size % SAMPLE_WIDTH
+
+    async def _wait_for_write_drain(self):
+        """Hold off sending until the write buffer is back under its low-water mark"""
+        started = time.monotonic()
+        self.write_stalls += 1
+        while (self._sending() and self._is_websocket_open()
+               and self._sample_write_buffer() > self.write_low_bytes):
+            # The ring keeps filling meanwhile, so its overflow policy decides what to shed
+            self._apply_overflow_policy()
+            await asyncio.sleep(0.01)
+        self.write_stall_seconds += time.monotonic() - started
+
+    async def _reconnect_websocket(self):
+        """Reconnect with jittered backoff, spooling audio meanwhile, then replay the spool"""
+        if self.quality:
+            self.quality.record_reconnect(time.monotonic())
+        failing_over = self.destination_mode == 'failover' and len(self.destinations) > 1
+        max_attempts = self.max_reconnect_attempts * (len(self.destinations) if failing_over else 1)
+        failed_at = time.monotonic()
+        # Sessions that dropped together would reach the failover deadline together, so each fails over a little early
+        failover_jitter = random.uniform(0, min(self.failover_seconds, self.reconnect_delay))
+        if self.destinations[self.active_destination].down_since is None:
+            self.destinations[self.active_destination].down_since = failed_at
+        while self._sending():
+            if self.reconnect_attempts >= max_attempts:
+                print("Max reconnection attempts reached")
+                self._spool_buffered_audio()
+                print(f"⚠️ Lost {self.spool.size() / BYTES_PER_SECOND:.1f}s of spooled audio")
+                self.spool.lost_bytes += self.spool.size()
+                self.spool.clear()
+                return False
+
+            now = time.monotonic()
+            destination = self.destinations[self.active_destination]
+            delay = max(backoff_delay(self.reconnect_delay, self.reconnect_attempts),
+                        destination.retry_after_until - now)
+            if failing_over:
+                # Retry the active destination until the failover point, then move to the next one
+                failover_at = self._failover_at(failed_at, failover_jitter)
+                delay = min(delay, max(0, failover_at - now))
+            print(f"Attempting reconnect in {delay:.1f}s (attempt {self.reconnect_attempts + 1})")
+
+            deadline = time.monotonic() + delay
+            while time.monotonic() < deadline and self._sending():
+                self._spool_buffered_audio()
+                await asyncio.sleep(min(0.5, deadline - time.monotonic()))
+
+            if failing_over and time.monotonic() >= self._failover_at(failed_at, failover_jitter):
+                self._fail_over()
+                failed_at = time.monotonic()
+                failover_jitter = random.uniform(0, min(self.failover_seconds, self.reconnect_delay))
+                destination = self.destinations[self.active_destination]
+            if destination.retry_after_until > time.monotonic():
+                # Every other destination asked for more time too; the next round waits it out
+                continue
+            if await self.connect_websocket():
+                print("WebSocket reconnected successfully")
+                if await self._replay_spool():
+                    return True
+                self.is_connected = False
+        return False
+
+    def _failover_at(self, failed_at, jitter):
+        """When to leave the active destination: on the deadline if a standby is already open, else jittered inside it"""
+        if any(d.is_open() for i, d in enumerate(self.destinations) if i != self.active_destination):
+            return failed_at + self.failover_seconds
+        return failed_at + self.failover_seconds - jitter
+
+    async def _report_gaps(self, end_position):
+        """Tell the backend about capture gaps that start before the frame about to be sent"""
+        if not self.timeline:
+            return
+        for position, gap_bytes, filled, reason in self.timeline.take_gaps(end_position):
+            await self.websocket.send(json.dumps({
+                'type': 'gap',
+                'at_ms': position * 1000 // BYTES_PER_SECOND,
+                'duration_ms': gap_bytes * 1000 // BYTES_PER_SECOND,
+                'filled_ms': filled * 1000 // BYTES_PER_SECOND,
+                'reason': reason
+            }))
+
+    async def _send_audio_frame(self, audio_data, position):
+        """Send one live frame, passing it through the voice activity gate if enabled"""
+        if not self.vad_gate:
+            await self._send_pcm(audio_data, position, self.frame_capture_time)
+            return
+
+        silence_ms, frames = self.vad_gate.process(audio_data)
+        if silence_ms:
+            await self.websocket.send(json.dumps({'type': 'silence', 'duration_ms': silence_ms}))
+        # Pre-roll frames released with speech sit right before the current one
+        position += len(audio_data) - sum(len(frame) for frame in frames)
+        for frame in frames:
+            await self._send_pcm(frame, position)
+            position += len(frame)
+
+    async def _send_pcm(self, pcm, position=None, captured_at=None):
+        """Send PCM as-is or through the connection's encoder, behind a frame header if negotiated"""
+        if position is not None:
+            self._track_frame_position(position, len(pcm))
+            self._last_pcm_position = position
+        payload = self.encoder.encode(pcm) if self.encoder else pcm
+        if not payload:
+            return
+        if self.frame_header and position is not None:
+            payload = self._pack_frame_header(position, captured_at) + payload
+        await self.websocket.send(payload)
+        self.destinations[self.active_destination].sent_bytes += len(pcm)
+        if self.first_audio_at is None:
+            self.first_audio_at = time.monotonic()
+
+    def _track_frame_position(self, position, size):
+        if position != self._next_frame_position:
+            self._pending_frame_flags |= FRAME_FLAG_DISCONTINUITY
+        if position < self._sent_high_position:
+            # Resent after a reconnect: the backend may already have it and dedupes by position
+            self._pending_frame_flags |= FRAME_FLAG_REPLAY
+        self._next_frame_position = position + size
+        self._sent_high_position = max(self._sent_high_position, self._next_frame_position)
+
+    def _pack_frame_header(self, position, captured_at=None):
+        """Binary header for the PCM at position; encoded payloads carry it for the latest PCM fed in"""
+        flags = self._pending_frame_flags | (FRAME_FLAG_ENCODED if self.encoder else 0)
+        self._pending_frame_flags = 0
+        header = pack_frame_header(flags, self.frames_sent, position, captured_at)
+        self.frames_sent += 1
+        return header
+
+    async def _track_acknowledgements(self):
+        """Release acknowledged audio and ping to acknowledge what was sent since"""
+        while self._pending_acks and self._pending_acks[0][0].done():
+            pong_waiter, sent_total = self._pending_acks.popleft()
+            if not pong_waiter.cancelled() and pong_waiter.exception() is None:
+                self.audio_buffer.ack(sent_total)
+
+        now = time.monotonic()
+        unacked = self.audio_buffer.unacked()
+        if unacked and (now - self._last_ack_ping >= self.ack_interval or unacked > self.high_water_bytes // 2):
+            # A pong proves the backend has read every frame written before the ping
+            self._pending_acks.append((await self.websocket.ping(), self.audio_buffer.sent_total))
+            self._last_ack_ping = now
+        else:
+            # Give the connection a loop iteration to notice a pong or a close
+            await asyncio.sleep(0)
+
+    def _apply_overflow_policy(self):
+        """Shed or spill buffered audio once the ring passes its high-water mark"""
+        occupancy = self.audio_buffer.occupancy()
+        if occupancy <= self.high_water_bytes:
+            return
+
+        if self.overflow_policy == 'drop-oldest':
+            dropped = self.audio_buffer.drop_oldest(occupancy - self.low_water_bytes)
+            self.dropped_oldest_bytes += dropped
+            print(f"⚠️ Audio buffer over high-water mark, dropped oldest {dropped / BYTES_PER_SECOND:.1f}s")
+        elif self.overflow_policy == 'spill-to-disk':
+            self._spool_buffered_audio()
+            self.spilled_bytes += occupancy
+            print(f"⚠️ Audio buffer over high-water mark, spilled {occupancy / BYTES_PER_SECOND:.1f}s to disk")
+        # drop-newest needs nothing here: capture discards new audio when the ring is full
+
+    def _spool_buffered_audio(self):
+        """Move everything in the ring buffer, unacknowledged audio first, into the replay spool"""
+        self._pending_acks.clear()
+        self.audio_buffer.rewind()
+        while self.audio_buffer.available():
+            data = self.audio_buffer.peek(self.audio_buffer.capacity)
+            self.spool.append(data, self.audio_buffer.sent_total)
+            self.audio_buffer.consume(len(data))
+
+    async def _replay_spool(self):
+        """Send spooled audio ahead of live capture, faster than real time"""
+        self._spool_buffered_audio()
+        total = self.spool.size()
+        if not total:
+            return True
+
+        print(f"Replaying {total / BYTES_PER_SECOND:.1f}s of spooled audio "
+              f"(lost so far: {self.spool.lost_bytes / BYTES_PER_SECOND:.1f}s)")
+        started = time.monotonic()
+        sent = 0
+        while self.spool.size():
+            # Spooled audio is only released once a pong confirms the backend read the batch
+            batch = memoryview(self.spool.peek(max(self.frame_bytes, int(4 * BYTES_PER_SECOND))))
+            batch_position = self.spool.head_position()
+            # Replay is about throughput, so frames always go out coalesced
+            message_bytes = self.frame_bytes * self.max_coalesce_frames
+            try:
+                for offset in range(0, len(batch), message_bytes):
+                    if self._sample_write_buffer() >= self.write_high_bytes:
+                        await self._wait_for_write_drain()
+                    await self._send_pcm(
+                        batch[offset:offset + message_bytes],
+                        batch_position + offset if batch_position is not None else None
+                    )
+                pong_waiter = await self.websocket.ping()
+                deadline = time.monotonic() + 10
+                while not pong_waiter.done():
+                    if time.monotonic() > deadline:
+                        raise asyncio.TimeoutError("no pong for replayed audio")
+                    await asyncio.wait({pong_waiter}, timeout=0.5)
+                    self._apply_overflow_policy()
+                pong_waiter.result()
+            except (websockets.exceptions.ConnectionClosed,
+                    websockets.exceptions.WebSocketException,
+                    asyncio.TimeoutError) as e:
+                print(f"🔌 WebSocket error during replay: {e}")
+                return False
+            self.spool.consume(len(batch))
+            sent += len(batch)
+            self.replayed_bytes += len(batch)
+
+            # Keep the ring from overflowing while a long replay is in progress
+            if self.audio_buffer.occupancy() > self.high_water_bytes // 2:
+                self._spool_buffered_audio()
+                continue
+            if self.replay_speed > 0:
+                ahead = sent / (BYTES_PER_SECOND * self.replay_speed) - (time.monotonic() - started)
+                if ahead > 0:
+                    await asyncio.sleep(ahead)
+                    self._apply_overflow_policy()
+
+        print(f"Replay complete: {sent / BYTES_PER_SECOND:.1f}s sent in {time.monotonic() - started:.1f}s")
+        return True
+
+    def _cleanup_audio_capture(self, backend=None):
+        """Clean up audio capture resources; a worker passes its own backend, which may have been replaced"""
+        if backend is None or backend is self.capture_backend:
+            backend = self.capture_backend
+            self.capture_backend = None
+            self.audio_buffer.flush()
+        if backend:
+            print(f"Stopping {backend.name} audio capture...")
+            try:
+                backend.close()
+            except Exception as e:
+                print(f"Error stopping audio capture: {e}")
+
+    async def cleanup(self):
+        """Clean up all streaming resources, draining buffered audio first"""
+        print("Cleaning up audio streamer...")
+        self.stop_streaming()
+        await self.wait_stopped(self.drain_seconds + 5)
         self._stop_event.set()
+        self.is_connected = False
+        
+        self._cleanup_audio_capture()
+        self.fanout.close()
+        self.audio_buffer.clear()
+        self.spool.clear()
+        if self.recorder:
+            self.recorder.close()
+        
+        if self.websocket and not self.websocket.closed:
+            try:
+                await self.websocket.close()
+                print("Audio WebSocket connection closed")
+            except Exception as e:
+                print(f"Error closing WebSocket: {e}")
+            self.websocket = None
+        
+        print(f"Final stats: {self.bytes_transmitted / 1024:.2f} KB transmitted total")
+
+    def stop_streaming(self, drain=None):
+        """Stop capture now; with drain, buffered audio still goes out for up to drain_seconds
+
+        drain defaults to AUDIO_DRAIN_SECONDS being non-zero. Without it the
+        sender stops at once and buffered audio is discarded.
+        """
+        if drain is None:
+            if self._drain_deadline is not None and not self._drained.is_set():
+                # Already draining, e.g. /stop followed by the end of join_meet
+                return
+            drain = self.drain_seconds > 0
+        if drain and self.is_streaming and self._workers:
+            self._drain_started = time.monotonic()
+            self._drain_deadline = self._drain_started + self.drain_seconds
+            print(f"Draining buffered audio for up to {self.drain_seconds:.0f}s...")
+        else:
+            self._stop_event.set()
+            if not self._workers:
+                self._drained.set()
+        self.is_streaming = False
+        self.fanout.close()
+        if self.recorder:
+            self.recorder.close()
+
+    def wait_drained(self, timeout=None):
+        """Block until the sender has stopped, returns drain_result (None while it is still running)"""
+        self._drained.wait(timeout)
+        return self.drain_result
         
     def get_status(self):
-        """Get current streaming status"""
+        """Get current streaming status"""
+        return {
+            'is_streaming': self.is_streaming,
+            'is_connected': self.is_connected,
+            'draining': self._drain_deadline is not None and not self._drained.is_set(),
+            'drain': self.drain_result,
+            'bytes_transmitted': self.bytes_transmitted,
+            'buffered_bytes': self.audio_buffer.available(),
+            'buffer_capacity': self.audio_buffer.capacity,
+            'buffer_occupancy': self.audio_buffer.occupancy() / self.high_water_bytes,
+            'overflow_policy': self.overflow_policy,
+            'dropped_bytes': self.audio_buffer.dropped_bytes + self.dropped_oldest_bytes,
+            'dropped_newest_bytes': self.audio_buffer.dropped_bytes,
+            'dropped_oldest_bytes': self.dropped_oldest_bytes,
+            'spilled_bytes': self.spilled_bytes,
+            'unacked_bytes': self.audio_buffer.unacked(),
+            'spooled_bytes': self.spool.size(),
+            'replayed_bytes': self.replayed_bytes,
+            'lost_audio_seconds': (self.audio_buffer.dropped_bytes + self.dropped_oldest_bytes + self.spool.lost_bytes) / BYTES_PER_SECOND,
+            'reconnect_attempts': self.reconnect_attempts,
+            'reconnect_bucket': get_reconnect_bucket().get_status(),
+            'capture_backend': self.capture_backend.name if self.capture_backend else None,
+            'capture_rate_bps': self.capture_rate(),
+            'expected_rate_bps': BYTES_PER_SECOND,
+            'capture_restarts': self.capture_restarts,
+            'capture_stalls': self.capture_stalls,
+            'capture_gap_seconds': round(self.capture_gap_seconds, 3),
+            'timeline': self.timeline.get_status() if self.timeline else None,
+            'mode': self.mode,
+            'vad': self.vad_gate.get_status() if self.vad_gate else None,
+            'codec': self.codec,
+            'output_sample_rate': self.output_sample_rate,
+            'quality': self.quality.get_status() if self.quality else None,
+            'recording': self.recorder.get_status() if self.recorder else None,
+            'fanout': self.fanout.get_status(),
+            'latency': {
+                'queue_wait': self.queue_wait_histogram.get_status(),
+                'send': self.send_histogram.get_status()
+            },
+            'profile': self.profile['name'],
+            'frame_ms': self.profile['frame_ms'],
+            'protocol': {
+                'mode': self.protocol,
+                'version': AUDIO_PROTOCOL_VERSION,
+                'session_id': self.session_id,
+                'frame_header': self.frame_header,
+                'frames_sent': self.frames_sent
+            },
+            'write_buffer': {
+                'bytes': self.write_buffer_bytes,
+                'max_bytes': self.max_write_buffer_bytes,
+                'high_water_bytes': self.write_high_bytes,
+                'low_water_bytes': self.write_low_bytes,
+                'stalls': self.write_stalls,
+                'stall_seconds': round(self.write_stall_seconds, 3),
+                'coalesced_frames': self.coalesced_frames
+            },
+            'multiplex': self.websocket.get_status() if isinstance(self.websocket, AudioChannel) else None,
+            'destinations': {
+                'mode': self.destination_mode,
+                'active': self.destinations[self.active_destination].url,
+                'failovers': self.failovers,
+                'failover_seconds': self.failover_seconds,
+                'list': [
+                    d.get_status(self._is_websocket_open(), self._primary_lag_bytes()) if i == self.active_destination
+                    else d.get_status()
+                    for i, d in enumerate(self.destinations)
+                ]
+            }
+        }
+
+    def _primary_lag_bytes(self):
+        """Captured audio the active destination has not acknowledged yet"""
+        return self.audio_buffer.occupancy() + self.spool.size()
+
+class AsyncRealtimeAudioStreamer(RealtimeAudioStreamer):
+    """Capture and send as tasks on the caller's event loop, with no worker threads"""
+    mode = 'asyncio'
+
+    def __init__(self, backend_url, options=None, token=None, interview_id=None, session_id=None):
+        super().__init__(backend_url, options, token, interview_id, session_id)
+        self._audio_ready = None
+
+    def start_realtime_streaming(self, duration_minutes=60):
+        """Start capture and sender tasks on the running event loop"""
+        if self.is_streaming:
+            print("Audio streaming already running")
+            return None
+
+        self.is_streaming = True
+        self._stop_event.clear()
+        self._audio_ready = asyncio.Event()
+        self._last_capture_at = self._stall_checked_at = time.monotonic()
+        if self.recorder:
+            self.recorder.start()
+
+        self._workers = [
+            self._start_capture(),
+            asyncio.create_task(self._websocket_sender_async(), name="WebSocketSenderTask"),
+            asyncio.create_task(self._watchdog_async(), name="AudioWatchdogTask"),
+        ]
+        return self._workers
+
+    async def wait_stopped(self, timeout=10):
+        """Wait for the capture and sender tasks to finish"""
+        pending = [task for task in self._workers if not task.done()]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+
+    def _start_capture(self):
+        """Start the capture task, cancelling one left waiting on a stuck executor read"""
+        self._capture_generation += 1
+        self.audio_buffer.writer_generation = self._capture_generation
+        if self._capture_worker and not self._capture_worker.done():
+            self._capture_worker.cancel()
+        self._capture_worker = asyncio.create_task(self._capture_audio_async(), name="AudioCaptureTask")
+        return self._capture_worker
+
+    async def _capture_audio_async(self):
+        """Feed the ring buffer from the event loop, reopening the pipeline whenever it ends early"""
+        print("Starting system audio capture...")
+        await asyncio.to_thread(self._setup_virtual_audio_sink)
+
+        while self.is_streaming and not self._stop_event.is_set():
+            captured_before = self.bytes_transmitted
+            await self._capture_once_async()
+            if not self._should_restart_capture(captured_before):
+                break
+            await asyncio.sleep(min(self._restart_delay(), self.stall_timeout))
+
+    async def _capture_once_async(self):
+        """Open a capture backend and read it until it ends"""
+        for audio_source in ("virtual_speaker.monitor", "@DEFAULT_MONITOR@"):
+            try:
+                print(f"Capturing system audio from: {audio_source}")
+                self.capture_backend = await asyncio.to_thread(
+                    open_capture_backend, audio_source, self.capture_backend_name, self.chunk_size
+                )
+                break
+            except Exception as e:
+                print(f"System audio capture error: {e}")
+        else:
+            return
+
+        backend = self.capture_backend
+        try:
+            if hasattr(backend, 'fileno'):
+                await self._capture_from_pipe()
+            else:
+                await self._capture_from_blocking_reader()
+        finally:
+            self._cleanup_audio_capture(backend)
+
+    async def _watchdog_async(self):
+        while self.is_streaming and not self._stop_event.is_set():
+            await asyncio.sleep(1.0)
+            self._check_capture_health()
+
+    async def _capture_from_pipe(self):
+        """Read a subprocess pipe whenever the loop reports it readable"""
+        loop = asyncio.get_running_loop()
+        fd = self.capture_backend.fileno()
+        os.set_blocking(fd, False)
+        finished = loop.create_future()
+        generation = self._capture_generation
+
+        def on_readable():
+            try:
+                count = self.audio_buffer.fill_from(self.capture_backend, self.chunk_size, generation)
+            except BlockingIOError:
+                return
+            except Exception as e:
+                print(f"Error reading audio data: {e}")
+                count = 0
+            if count:
+                self._on_audio_captured(count)
+                self._audio_ready.set()
+            elif not finished.done():
+                finished.set_result(None)
+
+        loop.add_reader(fd, on_readable)
+        try:
+            while self.is_streaming and not self._stop_event.is_set() and not finished.done():
+                await asyncio.wait({finished}, timeout=0.5)
+        finally:
+            loop.remove_reader(fd)
+
+    async def _capture_from_blocking_reader(self):
+        """Run each blocking backend read in the default executor"""
+        loop = asyncio.get_running_loop()
+        backend = self.capture_backend
+        # A read stuck in the executor outlives this task if the watchdog replaces it; its result is then discarded
+        generation = self._capture_generation
+        while self.is_streaming and not self._stop_event.is_set() and backend.is_alive():
+            try:
+                count = await loop.run_in_executor(
+                    None, self.audio_buffer.fill_from, backend, self.chunk_size, generation
+                )
+            except Exception as e:
+                print(f"Error reading audio data: {e}")
+                break
+            if count:
+                self._on_audio_captured(count)
+                self._audio_ready.set()
+
+    async def _wait_for_audio(self, min_bytes, timeout):
+        """Wait on the capture task's wakeups instead of a thread condition"""
+        deadline = time.monotonic() + timeout
+        while True:
+            self._audio_ready.clear()
+            available = self.audio_buffer.available()
+            remaining = deadline - time.monotonic()
+            if available >= min_bytes or remaining <= 0 or self._stop_event.is_set():
+                return available
+            try:
+                await asyncio.wait_for(self._audio_ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+def create_audio_streamer(backend_url, options=None, token=None, interview_id=None, session_id=None):
+    """Build the streamer implementation selected by AUDIO_STREAMER_MODE"""
+    mode = (options or {}).get('streamer_mode') or os.getenv("AUDIO_STREAMER_MODE", "threaded")
+    if mode == AsyncRealtimeAudioStreamer.mode:
+        return AsyncRealtimeAudioStreamer(backend_url, options, token, interview_id, session_id)
+    return RealtimeAudioStreamer(backend_url, options, token, interview_id, session_id)
+    
+def make_request(url, headers, method="GET", data=None, files=None):
+    if method == "POST":
+        response = requests.post(url, headers=headers, json=data, files=files)
+    else:
+        response = requests.get(url, headers=headers)
+    return response.json()
+
+# Evaluates every XPath in one round trip; if none matches yet, re-evaluates on DOM mutations until the timeout
+FIND_FIRST_SCRIPT = """
+const [selectors, timeoutMs, clickable, done] = arguments;
+function usable(el) {
+    if (!clickable) return true;
+    if (el.disabled || (el.getAttribute && el.getAttribute('aria-disabled') === 'true')) return false;
+    const rect = el.getBoundingClientRect();
+    return rect.width > 0 && rect.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+}
+function probe() {
+    for (let i = 0; i < selectors.length; i++) {
+        const found = document.evaluate(selectors[i], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (let j = 0; j < found.snapshotLength; j++) {
+            if (usable(found.snapshotItem(j))) return [i, found.snapshotItem(j)];
+        }
+    }
+    return null;
+}
+const first = probe();
+if (first || timeoutMs <= 0) {
+    done(first);
+    return;
+}
+let scheduled = false;
+let finished = false;
+function check() {
+    scheduled = false;
+    const match = probe();
+    if (match) finish(match);
+}
+const observer = new MutationObserver(() => {
+    if (!scheduled) {
+        scheduled = true;
+        setTimeout(check, 20);
+    }
+});
+// Visibility can change through stylesheets alone, which no mutation reports
+const poll = setInterval(check, 250);
+const timer = setTimeout(() => finish(null), timeoutMs);
+function finish(result) {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearInterval(poll);
+    clearTimeout(timer);
+    done(result);
+}
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+"""
+
+class SelectorStats:
+    """Which selector matched in each join phase, and how fast, persisted across joins as JSON
+
+    Hits decay with a half-life, so after a Meet UI change the selectors
+    that work now overtake the ones that used to. Selectors that have not
+    matched for max_age seconds are forgotten.
+    """
+
+    def __init__(self, path, half_life=7 * 86400, max_age=30 * 86400):
+        self.path = path
+        self.half_life = half_life
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.phases = {}
+        try:
+            with open(path) as f:
+                self.phases = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable selector stats {path}: {e}")
+
+    def _decay(self, entry, now):
+        return entry['hits'] * 0.5 ** ((now - entry['updated']) / self.half_life)
+
+    def order(self, phase, selectors):
+        """selectors by decayed hit count, best first; unseen ones keep their order after the rest"""
+        now = time.time()
+        with self._lock:
+            learned = self.phases.get(phase, {}).get('selectors', {})
+            scores = {selector: self._decay(entry, now) for selector, entry in learned.items()}
+        return sorted(selectors, key=lambda selector: -scores.get(selector, 0))
+
+    def record(self, phase, selector, elapsed):
+        """Count a lookup for phase; selector is None when nothing matched"""
+        now = time.time()
+        with self._lock:
+            stats = self.phases.setdefault(phase, {'lookups': 0, 'misses': 0, 'selectors': {}})
+            stats['lookups'] += 1
+            if selector is None:
+                stats['misses'] += 1
+            else:
+                entry = stats['selectors'].get(selector)
+                if entry is None:
+                    entry = stats['selectors'][selector] = {'hits': 0.0, 'updated': now, 'ms': elapsed * 1000}
+                entry['hits'] = self._decay(entry, now) + 1
+                entry['updated'] = now
+                entry['ms'] = round(0.8 * entry['ms'] + 0.2 * elapsed * 1000, 1)
+            for name in [name for name, entry in stats['selectors'].items() if now - entry['updated'] > self.max_age]:
+                del stats['selectors'][name]
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(self.phases, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save selector stats: {e}")
+
+    def get_status(self):
+        now = time.time()
+        with self._lock:
+            return {
+                phase: {
+                    'lookups': stats['lookups'],
+                    'misses': stats['misses'],
+                    'selectors': [
+                        {'selector': selector, 'score': round(self._decay(entry, now), 2), 'ms': entry['ms']}
+                        for selector, entry in sorted(stats['selectors'].items(), key=lambda item: -self._decay(item[1], now))
+                    ]
+                }
+                for phase, stats in self.phases.items()
+            }
+
+selector_stats = None
+selector_stats_lock = threading.Lock()
+
+def get_selector_stats():
+    global selector_stats
+    with selector_stats_lock:
+        if selector_stats is None:
+            selector_stats = SelectorStats(
+                os.getenv("SELECTOR_STATS_PATH") or os.path.join(os.getenv("STATE_DIR", "state"), "selector_stats.json"),
+                half_life=float(os.getenv("SELECTOR_STATS_HALF_LIFE_DAYS", "7")) * 86400,
+                max_age=float(os.getenv("SELECTOR_STATS_MAX_AGE_DAYS", "30")) * 86400
+            )
+        return selector_stats
+
+def find_first(driver, selectors, timeout=0, clickable=False, phase=None):
+    """Wait up to timeout seconds for any of the XPath selectors, returns (selector, element) or (None, None)
+
+    Earlier selectors win when several match. The wait ends as soon as
+    any candidate appears, so its cost does not grow with the list. With
+    a phase, the list is first reordered by what matched in past joins
+    and the outcome is recorded.
+    """
+    if phase:
+        selectors = get_selector_stats().order(phase, selectors)
+    started = time.monotonic()
+    try:
+        driver.set_script_timeout(timeout + 5)
+        match = driver.execute_async_script(FIND_FIRST_SCRIPT, list(selectors), int(timeout * 1000), clickable)
+    except Exception as e:
+        print(f"Selector lookup failed: {e}")
+        return None, None
+    selector, element = (selectors[int(match[0])], match[1]) if match else (None, None)
+    if phase:
+        get_selector_stats().record(phase, selector, time.monotonic() - started)
+    return selector, element
+
+# Candidate XPaths for each step of the Meet join flow; find_first() reorders them by past success
+PERMISSION_POPUP_SELECTORS = (
+    "/html/body/div/div[3]/div[2]/div/div/div/div/div[2]/div/div[1]/button",
+)
+NAME_INPUT_SELECTORS = (
+    '//*[@id="yDmH0d"]/c-wiz/div/div/div[14]/div[3]/div/div[2]/div[4]/div/div/div[2]/div[1]/div[1]/div[3]/label/input',
+    '//input[@type="text"]',
+    '//input[contains(@placeholder, "Your name")]',
+    '//input[contains(@aria-label, "Your name")]',
+)
+NAME_JOIN_BUTTON_SELECTORS = (
+    '//*[@id="yDmH0d"]/c-wiz/div/div/div[14]/div[3]/div/div[2]/div[4]/div/div/div[2]/div[1]/div[2]/div[1]/div[1]/button/span',
+    '//button[contains(text(), "Join now")]',
+    '//button[contains(text(), "Ask to join")]',
+    '//button[contains(text(), "Continue")]',
+    '//button[contains(text(), "Join")]',
+)
+JOIN_BUTTON_SELECTORS = (
+    "//span[contains(text(), 'Ask to join')]",
+    "//span[contains(text(), 'Join now')]",
+    "//span[contains(text(), 'Switch here')]",
+    "//span[contains(text(), 'Join')]",
+    "//span[contains(text(), 'Continue')]",
+    "//span[contains(text(), 'Request to join')]",
+    "//button[contains(text(), 'Ask to join')]",
+    "//button[contains(text(), 'Join now')]",
+    "//button[contains(text(), 'Request to join')]",
+    "//button[contains(text(), 'Join')]",
+    "//button[contains(text(), 'Continue')]",
+    "//button[contains(@aria-label, 'Join now')]",
+    "//button[contains(@aria-label, 'Ask to join')]",
+    "//button[contains(@aria-label, 'Join')]",
+    "//button[contains(@aria-label, 'Continue')]",
+    "//button[contains(@data-tooltip, 'Ask to join')]",
+    "//button[contains(@data-tooltip, 'Join now')]",
+    "//button[contains(@data-tooltip, 'Join')]",
+    "//button[contains(@data-tooltip, 'Continue')]",
+    "//div[contains(text(), 'Ask to join')]",
+    "//div[contains(text(), 'Request to join')]",
+    "//div[contains(text(), 'Join now')]",
+    "//div[contains(text(), 'Join')]",
+    "//div[contains(text(), 'Continue')]",
+    "//div[contains(@aria-label, 'Ask to join')]",
+    "//div[contains(@aria-label, 'Join now')]",
+    "//div[contains(@aria-label, 'Join')]",
+    "//div[contains(@aria-label, 'Continue')]",
+    "//div[contains(@data-tooltip, 'Ask to join')]",
+    "//div[contains(@data-tooltip, 'Join now')]",
+    "//div[contains(@data-tooltip, 'Join')]",
+    "//div[contains(@data-tooltip, 'Continue')]",
+)
+MEETING_INDICATORS = (
+    "//div[contains(@data-self-name, 'Recos AI Bot')]",
+    "//span[contains(text(), 'You')]",
+    "//div[contains(@aria-label, 'You are')]",
+    "//button[contains(@aria-label, 'Leave call')]",
+    "//button[contains(@data-tooltip, 'Leave call')]",
+    "//div[contains(text(), 'Meeting details')]",
+    "//div[contains(text(), 'People')]",
+    "//div[contains(text(), 'Chat')]",
+    "//div[contains(text(), 'Activities')]",
+)
+
+def wait_until(condition, timeout, interval=0.1):
+    """Poll condition until it returns something truthy; returns that, or None at the timeout"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            result = condition()
+        except Exception:
+            result = None
+        if result or time.monotonic() >= deadline:
+            return result
+        sleep(interval)
+
+async def google_sign_in(email, password, driver, timeout=30):
+    """Sign in, moving on as soon as each page is ready; True once the browser has left the sign-in pages"""
+    deadline = time.monotonic() + timeout
+    driver.get("https://accounts.google.com")
+
+    _, email_field = find_first(driver, ["//input[@name='identifier']"], timeout=max(0, deadline - time.monotonic()), clickable=True)
+    if not email_field:
+        raise TimeoutException("email field did not appear")
+    email_field.send_keys(email)
+    driver.find_element(By.ID, "identifierNext").click()
+
+    _, password_field = find_first(driver, ["//input[@name='Passwd']"], timeout=max(0, deadline - time.monotonic()), clickable=True)
+    if not password_field:
+        raise TimeoutException("password field did not appear")
+    password_field.click()
+    password_field.send_keys(password)
+    password_field.send_keys(Keys.RETURN)
+
+    return bool(wait_until(
+        lambda: 'accounts.google.com' not in driver.current_url.split('?')[0],
+        max(0, deadline - time.monotonic())
+    ))
+
+JOIN_STATES = ('sign_in', 'navigate', 'pre_join', 'name', 'request_admission', 'in_call')
+# Seconds each state may wait for the condition that ends it, overridable as JOIN_<STATE>_TIMEOUT
+JOIN_TIMEOUTS = {
+    'sign_in': 30,
+    'navigate': 30,
+    'pre_join': 20,
+    'name': 10,
+    'request_admission': 15,
+    'in_call': 60,
+}
+
+join_metrics = {
+    'phases': {state: LatencyHistogram() for state in JOIN_STATES},
+    'join': LatencyHistogram(),
+    'time_to_audio': LatencyHistogram(),
+    'commands': {},
+}
+
+class JoinTrace:
+    """Spans of one bot session in Chrome trace-event format, viewable in chrome://tracing or Perfetto
+
+    Timestamps are time.monotonic() microseconds since POST /start, and
+    every thread that records gets its own track.
+    """
+
+    def __init__(self, session_id=None, started=None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.started = time.monotonic() if started is None else started
+        self.events = []
+        self._threads = set()
+        self._lock = threading.Lock()
+
+    def _append(self, event):
+        tid = threading.get_ident()
+        event.update(pid=1, tid=tid)
+        with self._lock:
+            if tid not in self._threads:
+                self._threads.add(tid)
+                self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid,
+                                    'args': {'name': threading.current_thread().name}})
+            self.events.append(event)
+
+    def _us(self, when):
+        return round((when - self.started) * 1e6)
+
+    def complete(self, name, cat, started, duration, args=None):
+        self._append({'name': name, 'cat': cat, 'ph': 'X', 'ts': self._us(started),
+                      'dur': round(duration * 1e6), 'args': args or {}})
+
+    def instant(self, name, cat, args=None):
+        self._append({'name': name, 'cat': cat, 'ph': 'i', 's': 'p', 'ts': self._us(time.monotonic()),
+                      'args': args or {}})
+
+    @contextlib.contextmanager
+    def span(self, name, cat='join', args=None):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.complete(name, cat, started, time.monotonic() - started, args)
+
+    def to_json(self):
+        with self._lock:
+            events = list(self.events)
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'session_id': self.session_id}
+        }
+
+join_traces = {}
+MAX_JOIN_TRACES = 20
+
+def start_join_trace(started=None):
+    """New trace for a bot session, keeping only the most recent ones"""
+    trace = JoinTrace(started=started)
+    join_traces[trace.session_id] = trace
+    while len(join_traces) > MAX_JOIN_TRACES:
+        del join_traces[next(iter(join_traces))]
+    return trace
+
+def trace_driver(driver, trace):
+    """Record every WebDriver command, CDP calls included, as a span and in join_metrics['commands']"""
+    # A pooled browser comes back for later sessions, so wrap the original rather than the last trace
+    execute = getattr(driver, '_untraced_execute', driver.execute)
+    driver._untraced_execute = execute
+
+    def traced_execute(driver_command, params=None):
+        name, cat, args = driver_command, 'selenium', {}
+        if driver_command == 'executeCdpCommand' and params:
+            name, cat = f"CDP {params.get('cmd')}", 'cdp'
+        elif driver_command == 'get' and params:
+            args = {'url': params.get('url')}
+        started = time.monotonic()
+        try:
+            return execute(driver_command, params)
+        finally:
+            elapsed = time.monotonic() - started
+            trace.complete(name, cat, started, elapsed, args)
+            if name not in join_metrics['commands']:
+                join_metrics['commands'][name] = LatencyHistogram()
+            join_metrics['commands'][name].record(elapsed)
+
+    driver.execute = traced_execute
+    return driver
+
+class JoinFlow:
+    """Drives the browser from sign-in to in-call, one state at a time
+
+    Each state ends on a page or DOM condition with its own timeout rather
+    than after a fixed sleep, and its duration goes into join_metrics.
+    Only a failed sign-in or navigation stops the flow; the Meet steps
+    fall through to the next state, as a half-recognised page often
+    still joins.
+    """
+
+    def __init__(self, driver, meet_link, email, password, bot_name="Recos AI Bot", trace=None, signed_in=False):
+        self.driver = driver
+        self.signed_in = signed_in
+        self.trace = trace or JoinTrace()
+        self.meet_link = meet_link
+        self.email = email
+        self.password = password
+        self.bot_name = bot_name
+        self.timeouts = {
+            state: float(os.getenv(f"JOIN_{state.upper()}_TIMEOUT", str(default)))
+            for state, default in JOIN_TIMEOUTS.items()
+        }
+        self.state = None
+        self.failed = False
+        self.timings = []
+        self._name_input = None
+
+    async def run(self):
+        """Walk every state, returns True once the call is confirmed"""
+        started = time.monotonic()
+        outcome = None
+        for state in JOIN_STATES:
+            if bot_state['status'] == 'stopping':
+                return False
+            self.state = state
+            print(f"Join state: {state}")
+            state_started = time.monotonic()
+            try:
+                outcome = await getattr(self, f'_{state}')(self.timeouts[state])
+            except Exception as e:
+                outcome = f"error: {e}"
+                self.failed = state in ('sign_in', 'navigate')
+            elapsed = time.monotonic() - state_started
+            self.trace.complete(state, 'join', state_started, elapsed, {'outcome': outcome})
+            join_metrics['phases'][state].record(elapsed)
+            self.timings.append({'state': state, 'outcome': outcome, 'seconds': round(elapsed, 3)})
+            print(f"Join state {state}: {outcome} after {elapsed:.2f}s")
+            if self.failed:
+                return False
+        join_metrics['join'].record(time.monotonic() - started)
+        self.trace.complete('join', 'join', started, time.monotonic() - started)
+        return outcome == 'in call'
+
+    async def _sign_in(self, timeout):
+        if self.signed_in:
+            return 'already signed in'
+        if await google_sign_in(self.email, self.password, self.driver, timeout):
+            return 'signed in'
+        return 'unconfirmed'
+
+    async def _navigate(self, timeout):
+        print(f"Navigating to meet link: {self.meet_link}")
+        self.driver.set_page_load_timeout(timeout)
+        self.driver.get(self.meet_link)
+        try:
+            self.driver.execute_cdp_cmd(
+                "Browser.grantPermissions",
+                {
+                    "origin": self.meet_link,
+                    "permissions": [
+                        "geolocation",
+                        "audioCapture",
+                        "displayCapture",
+                        "videoCapture"
+                    ],
+                },
+            )
+        except Exception as e:
+            print(f"Warning: Could not grant permissions: {e}")
+        if not wait_until(lambda: self.driver.execute_script("return document.readyState") == 'complete', timeout):
+            return 'loading'
+        return 'loaded'
+
+    async def _pre_join(self, timeout):
+        """Wait until the pre-join screen offers anything to act on, dismissing the permission popup"""
+        deadline = time.monotonic() + timeout
+        candidates = PERMISSION_POPUP_SELECTORS + NAME_INPUT_SELECTORS + NAME_JOIN_BUTTON_SELECTORS + JOIN_BUTTON_SELECTORS
+        while True:
+            selector, element = find_first(self.driver, candidates, timeout=max(0, deadline - time.monotonic()), clickable=True)
+            if not element:
+                return 'not ready'
+            if selector not in PERMISSION_POPUP_SELECTORS:
+                break
+            element.click()
+            print("Dismissed permission popup")
+            candidates = candidates[len(PERMISSION_POPUP_SELECTORS):]
+        if selector in NAME_INPUT_SELECTORS:
+            self._name_input = element
+        return 'ready'
+
+    async def _name(self, timeout):
+        # Signed-in accounts get no name field, so only wait for one if the pre-join screen was not ready yet
+        wait = timeout if self._name_input is None else 0
+        selector, name_input = find_first(self.driver, NAME_INPUT_SELECTORS, timeout=wait, clickable=True, phase='name_input')
+        if not name_input:
+            return 'no name field'
+        name_input.click()
+        name_input.send_keys(self.bot_name)
+        wait_until(lambda: name_input.get_attribute('value') == self.bot_name, timeout)
+        self._name_input = name_input
+        self.driver.save_screenshot("screenshots/give_non_registered_name.png")
+        return 'name set'
+
+    async def _request_admission(self, timeout):
+        deadline = time.monotonic() + timeout
+        if self._name_input is not None:
+            selector, button = find_first(self.driver, NAME_JOIN_BUTTON_SELECTORS, timeout=min(5, timeout), clickable=True, phase='name_join_button')
+            if button:
+                button.click()
+                print(f"Clicked join button using selector: {selector}")
+                return 'requested'
+        selector, button = find_first(
+            self.driver, JOIN_BUTTON_SELECTORS, timeout=max(0, deadline - time.monotonic()), clickable=True, phase='join_button'
+        )
+        if not button:
+            print("Could not find any join button")
+            return 'no join button'
+        button.click()
+        print(f"Clicked join button using selector: {selector}")
+        return 'requested'
+
+    async def _in_call(self, timeout):
+        selector, indicator = find_first(self.driver, MEETING_INDICATORS, timeout=timeout, phase='meeting_indicator')
+        if not indicator:
+            return 'unconfirmed'
+        print(f"Detected meeting using selector: {selector}")
+        return 'in call'
+
+    def get_status(self):
         return {
-            'is_streaming': self.is_streaming,
-            'is_connected': self.is_connected,
-            'bytes_transmitted': self.bytes_transmitted,
-            'queue_size': self.audio_queue.qsize(),
-            'reconnect_attempts': self.reconnect_attempts
+            'state': self.state,
+            'failed': self.failed,
+            'timings': self.timings
         }
-    
-def make_request(url, headers, method="GET", data=None, files=None):
-    if method == "POST":
-        response = requests.post(url, headers=headers, json=data, files=files)
-    else:
-        response = requests.get(url, headers=headers)
-    return response.json()
-
-async def google_sign_in(email, password, driver):
-    driver.get("https://accounts.google.com")
-    sleep(1)
-    
-    email_field = driver.find_element(By.NAME, "identifier")
-    email_field.send_keys(email)
-    # driver.save_screenshot("screenshots/email.png")
-    sleep(1)
-    
-    driver.find_element(By.ID, "identifierNext").click()
-    sleep(2)
-    # driver.save_screenshot("screenshots/password.png")
-    
-    password_field = driver.find_element(By.NAME, "Passwd")
-    password_field.click()
-    password_field.send_keys(password)
-    password_field.send_keys(Keys.RETURN)
-    sleep(3)
-    # driver.save_screenshot("screenshots/signed_in.png")
 
+@functools.lru_cache(maxsize=None)
 def get_chrome_version():
-    """Try to detect the installed Chrome version"""
+    """Try to detect the installed Chrome version, once per process"""
     try:
         if os.name == 'nt':  
             cmd = 'reg query "HKEY_CURRENT_USER\\Software\\Google\\Chrome\\BLBeacon" /v version'
@@ -627,6 +4268,276 @@ def get_chrome_version():
     
     return 108
 
+def launch_chrome(trace=None, debug_port=9222):
+    """Start Chrome for Meet, falling back to a minimal profile on Chrome 108 if that fails"""
+    trace = trace or JoinTrace()
+    log_path = "chromedriver.log"
+    try:
+        with trace.span('get_chrome_version', 'setup'):
+            chrome_version = get_chrome_version()
+        print(f"Detected Chrome version: {chrome_version}")
+        
+        options = uc.ChromeOptions()
+        options.add_argument("--use-fake-ui-for-media-stream")
+        options.add_argument("--window-size=1280x720")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-setuid-sandbox")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-application-cache")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-features=VizDisplayCompositor")
+        options.add_argument("--disable-features=TranslateUI")
+        options.add_argument("--disable-ipc-flooding-protection")
+        options.add_argument("--disable-background-timer-throttling")
+        options.add_argument("--disable-renderer-backgrounding")
+        options.add_argument("--disable-backgrounding-occluded-windows")
+        options.add_argument("--disable-features=AudioServiceOutOfProcess")
+        if debug_port:
+            options.add_argument(f"--remote-debugging-port={debug_port}")
+        options.add_argument("--autoplay-policy=no-user-gesture-required") 
+        options.add_argument("--no-first-run")
+        options.add_argument("--no-default-browser-check")
+        options.add_argument("--disable-default-apps")
+        options.add_argument("--disable-sync")
+        options.add_argument("--metrics-recording-only")
+        options.add_argument("--disable-password-generation")
+        options.add_argument("--disable-translate")
+        options.add_argument("--disable-features=AutofillServerCommunication")
+        
+        with trace.span('launch_chrome', 'setup', {'version': chrome_version}):
+            return uc.Chrome(
+                version_main=chrome_version,
+                service_log_path=log_path, 
+                use_subprocess=False, 
+                options=options
+            )
+    except Exception as e:
+        print(f"Error initializing Chrome driver: {e}")
+        
+        fallback_options = uc.ChromeOptions()
+        fallback_options.add_argument("--use-fake-ui-for-media-stream")
+        fallback_options.add_argument("--window-size=1920x1080")
+        fallback_options.add_argument("--no-sandbox")
+        fallback_options.add_argument("--disable-setuid-sandbox")
+        fallback_options.add_argument("--disable-gpu")
+        
+        with trace.span('launch_chrome', 'setup', {'version': 108, 'fallback': True}):
+            return uc.Chrome(
+                version_main=108,
+                service_log_path=log_path, 
+                use_subprocess=False, 
+                options=fallback_options
+            )
+
+class BrowserPool:
+    """Chrome instances launched and signed in ahead of /start
+
+    A background thread keeps `size` browsers either idle or out in a
+    meeting. /start takes an idle one and only has to navigate to the
+    meeting; afterwards the browser is parked on about:blank and goes back
+    to the pool until it has served max_uses meetings or stops answering,
+    at which point it is quit and replaced.
+    """
+
+    def __init__(self, size, max_uses, email, password):
+        self.size = size
+        self.max_uses = max_uses
+        self.email = email
+        self.password = password
+        self._idle = deque()
+        self._out = set()
+        self._uses = {}
+        # Browsers the refill thread is starting; their slots are taken before they exist
+        self._launching = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.launched = 0
+        self.acquired = 0
+        self.misses = 0
+        self.reused = 0
+        self.retired = 0
+        self.failures = 0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._refill, name='browser-pool', daemon=True)
+        self._thread.start()
+        print(f"🔥 Browser pool started (size {self.size}, up to {self.max_uses} meetings per browser)")
+
+    def _refill(self):
+        consecutive_failures = 0
+        while not self._stopped.is_set():
+            self._wake.clear()
+            with self._lock:
+                launch = not self._stopped.is_set() and self._has_room()
+                if launch:
+                    self._launching += 1
+            if not launch:
+                self._wake.wait(30)
+                continue
+
+            driver = None
+            try:
+                started = time.monotonic()
+                driver = launch_chrome(debug_port=None)
+                if not asyncio.run(google_sign_in(self.email, self.password, driver)):
+                    raise RuntimeError("sign-in was not confirmed")
+                driver.get("about:blank")
+            except Exception as e:
+                with self._lock:
+                    self._launching -= 1
+                self.failures += 1
+                consecutive_failures += 1
+                print(f"Browser pool could not prepare a browser: {e}")
+                self._quit(driver)
+                self._stopped.wait(backoff_delay(5, consecutive_failures - 1, 300))
+                continue
+
+            consecutive_failures = 0
+            with self._lock:
+                self._launching -= 1
+                if self._stopped.is_set():
+                    keep = False
+                else:
+                    keep = True
+                    self._idle.append(driver)
+                    self._uses[id(driver)] = 0
+                    self.launched += 1
+                    idle = len(self._idle)
+            if not keep:
+                self._quit(driver)
+                break
+            print(f"🔥 Warm browser ready in {time.monotonic() - started:.1f}s ({idle}/{self.size} idle)")
+
+    def _has_room(self):
+        """Whether one more browser fits in the pool; call with the lock held"""
+        return len(self._idle) + len(self._out) + self._launching < self.size
+
+    def _alive(self, driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, driver):
+        if not driver:
+            return
+        with self._lock:
+            self._uses.pop(id(driver), None)
+            self._out.discard(id(driver))
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error quitting pooled driver: {e}")
+
+    def acquire(self):
+        """A signed-in browser that still answers, or None when none is idle"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    self.misses += 1
+                    self._wake.set()
+                    return None
+                driver = self._idle.popleft()
+                self._out.add(id(driver))
+            if self._alive(driver):
+                self.acquired += 1
+                return driver
+            print("Dropping a pooled browser that stopped responding")
+            self._quit(driver)
+            self._wake.set()
+
+    def release(self, driver, reuse=True):
+        """Park a browser after its meeting for the next /start, or quit it"""
+        with self._lock:
+            if driver in self._idle:
+                return
+            self._out.discard(id(driver))
+            uses = self._uses.get(id(driver), 0) + 1
+            room = self._has_room() and not self._stopped.is_set()
+        if reuse and room and uses < self.max_uses and self._alive(driver):
+            try:
+                # Leaves the call while keeping the Google session
+                driver.get("about:blank")
+            except Exception as e:
+                print(f"Could not reset browser for reuse: {e}")
+            else:
+                with self._lock:
+                    # The refill thread may have taken the slot while the browser was being reset
+                    kept = self._has_room() and not self._stopped.is_set()
+                    if kept:
+                        self._idle.append(driver)
+                        self._uses[id(driver)] = uses
+                        self.reused += 1
+                if kept:
+                    print(f"♻️ Browser returned to pool after {uses} meeting(s)")
+                    return
+        self.retired += 1
+        self._quit(driver)
+        self._wake.set()
+        print("Chrome driver quit")
+
+    def close(self):
+        """Stop refilling and quit every idle browser"""
+        self._stopped.set()
+        self._wake.set()
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for driver in idle:
+            self._quit(driver)
+
+    def get_status(self):
+        with self._lock:
+            idle = len(self._idle)
+        return {
+            'size': self.size,
+            'idle': idle,
+            'max_uses': self.max_uses,
+            'launched': self.launched,
+            'acquired': self.acquired,
+            'misses': self.misses,
+            'reused': self.reused,
+            'retired': self.retired,
+            'failures': self.failures
+        }
+
+browser_pool = None
+
+def start_browser_pool():
+    """Start the warm browser pool when BROWSER_POOL_SIZE asks for one"""
+    global browser_pool
+    size = int(os.getenv("BROWSER_POOL_SIZE", "0"))
+    if size <= 0 or browser_pool:
+        return browser_pool
+    email = os.getenv("GMAIL_USER_EMAIL", "")
+    password = os.getenv("GMAIL_USER_PASSWORD", "")
+    if email == "" or password == "":
+        print("Browser pool disabled: no email or password specified")
+        return None
+    browser_pool = BrowserPool(size, int(os.getenv("BROWSER_POOL_MAX_USES", "10")), email, password)
+    browser_pool.start()
+    return browser_pool
+
+def release_driver(driver, reuse=True):
+    """Hand a meeting's browser back to the pool, or quit it when there is no pool"""
+    if not driver:
+        return
+    if browser_pool:
+        browser_pool.release(driver, reuse)
+        return
+    try:
+        driver.quit()
+        print("Chrome driver quit")
+    except Exception as e:
+        print(f"Error quitting driver: {e}")
+
 def cleanup_chrome_processes():
     """Clean up any existing Chrome processes"""
     try:
@@ -640,8 +4551,9 @@ def cleanup_chrome_processes():
     except Exception as e:
         print(f"Error cleaning up Chrome processes: {e}")
 
-async def join_meet(meet_link, duration, token, interview_id):
+async def join_meet(meet_link, duration, token, interview_id, audio_options=None):
     bot_state['status'] = 'running'
+    trace = bot_state['trace'] or start_join_trace()
 
     # cleanup_chrome_processes()
 
@@ -657,7 +4569,8 @@ async def join_meet(meet_link, duration, token, interview_id):
         return
 
     try:
-        health_response = requests.get(f"{backend_url}/health", timeout=5)
+        with trace.span('backend_health', 'setup'):
+            health_response = requests.get(f"{backend_url}/health", timeout=5)
         if health_response.ok:
             print(f"Backend is healthy: {health_response.json()}")
         else:
@@ -674,76 +4587,27 @@ async def join_meet(meet_link, duration, token, interview_id):
         print("Error: sox is not installed or not in PATH")
 
     driver = None
+    warm = False
+    pool = browser_pool
+    if pool:
+        with trace.span('browser_pool_acquire', 'setup'):
+            driver = pool.acquire()
+        warm = driver is not None
+        trace.instant('browser', 'setup', {'warm': warm})
+        print("🔥 Using a warm browser from the pool" if warm else "Browser pool empty, launching Chrome")
 
-    try:
-        chrome_version = get_chrome_version()
-        print(f"Detected Chrome version: {chrome_version}")
-        
-        options = uc.ChromeOptions()
-        options.add_argument("--use-fake-ui-for-media-stream")
-        options.add_argument("--window-size=1280x720")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-setuid-sandbox")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--disable-extensions")
-        options.add_argument("--disable-application-cache")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-features=VizDisplayCompositor")
-        options.add_argument("--disable-features=TranslateUI")
-        options.add_argument("--disable-ipc-flooding-protection")
-        options.add_argument("--disable-background-timer-throttling")
-        options.add_argument("--disable-renderer-backgrounding")
-        options.add_argument("--disable-backgrounding-occluded-windows")
-        options.add_argument("--disable-features=AudioServiceOutOfProcess")
-        options.add_argument("--remote-debugging-port=9222")
-        options.add_argument("--autoplay-policy=no-user-gesture-required") 
-        options.add_argument("--no-first-run")
-        options.add_argument("--no-default-browser-check")
-        options.add_argument("--disable-default-apps")
-        options.add_argument("--disable-sync")
-        options.add_argument("--metrics-recording-only")
-        options.add_argument("--disable-password-generation")
-        options.add_argument("--disable-translate")
-        options.add_argument("--disable-features=AutofillServerCommunication")
-        
-        log_path = "chromedriver.log"
-        
-        driver = uc.Chrome(
-            version_main=chrome_version,
-            service_log_path=log_path, 
-            use_subprocess=False, 
-            options=options
-        )
-    except Exception as e:
-        print(f"Error initializing Chrome driver: {e}")
-        
+    if not driver:
         try:
-            fallback_options = uc.ChromeOptions()
-            fallback_options.add_argument("--use-fake-ui-for-media-stream")
-            fallback_options.add_argument("--window-size=1920x1080")
-            fallback_options.add_argument("--no-sandbox")
-            fallback_options.add_argument("--disable-setuid-sandbox")
-            fallback_options.add_argument("--disable-gpu")
-            
-            driver = uc.Chrome(
-                version_main=108,
-                service_log_path=log_path, 
-                use_subprocess=False, 
-                options=fallback_options
-            )
-        except Exception as e2:
-            print(f"Error with fallback Chrome driver: {e2}")
-            bot_state['status'] = 'error'
-            cleanup_bot()
-            return
-        
-        if not driver:
-            print("Failed to initialize Chrome driver")
+            # Pooled browsers run side by side, so only a lone browser gets the fixed debugging port
+            driver = launch_chrome(trace, debug_port=None if pool else 9222)
+        except Exception as e:
+            print(f"Error with fallback Chrome driver: {e}")
             bot_state['status'] = 'error'
             cleanup_bot()
             return
     
     bot_state['driver'] = driver
+    trace_driver(driver, trace)
     driver.set_window_size(1280, 720)
 
     email = os.getenv("GMAIL_USER_EMAIL", "")
@@ -751,293 +4615,79 @@ async def join_meet(meet_link, duration, token, interview_id):
 
     if email == "" or password == "":
         print("Error: No email or password specified")
-        driver.quit()
         bot_state['status'] = 'error'
         cleanup_bot()
         return
 
-    print("Google Sign in")
-    await google_sign_in(email, password, driver)
-
-    if bot_state['status'] == 'stopping':
-        print("Stop signal received, cleaning up")
-        cleanup_bot()
-        return
-
-    print(f"Navigating to meet link: {meet_link}")
-    driver.get(meet_link)
-    sleep(3)
-
-    try:
-        driver.execute_cdp_cmd(
-            "Browser.grantPermissions",
-            {
-                "origin": meet_link,
-                "permissions": [
-                    "geolocation",
-                    "audioCapture",
-                    "displayCapture",
-                    "videoCapture"
-                ],
-            },
-        )
-    except Exception as e:
-        print(f"Warning: Could not grant permissions: {e}")
-
-    if bot_state['status'] == 'stopping':
-        print("Stop signal received, cleaning up")
-        cleanup_bot()
-        return
-
-    try:
-        driver.find_element(
-            By.XPATH,
-            "/html/body/div/div[3]/div[2]/div/div/div/div/div[2]/div/div[1]/button",
-        ).click()
-        sleep(2)
-    except:
-        print("No popup")
-
-    # print("Disable microphone")
-    # sleep(3)
-
-    # missing_mic = False
-
-    # try:
-    #     print("Try to dismiss missing mic")
-    #     driver.find_element(By.CLASS_NAME, "VfPpkd-vQzf8d").find_element(By.XPATH, "..")
-    #     sleep(1)
-    #     missing_mic = True
-    # except:
-    #     pass
-
-    # try:
-    #     print("Allow Microphone")
-    #     driver.find_element(
-    #         By.XPATH,
-    #         "/html/body/div/div[3]/div[2]/div/div/div/div/div[2]/div/div[1]/button",
-    #     ).click()
-    #     sleep(1)
-    # except:
-    #     print("No Allow Microphone popup")
-
-    # try:
-    #     print("Try to disable microphone")
-    #     driver.find_element(
-    #         By.XPATH,
-    #         '//*[@id="yDmH0d"]/c-wiz/div/div/div[14]/div[3]/div/div[2]/div[4]/div/div/div[1]/div[1]/div/div[6]/div[1]/div/div',
-    #     ).click()
-    # except:
-    #     print("No microphone to disable")
-
-    sleep(1)
-
-    # wait = WebDriverWait(driver, 10)
-    # try:
-    #     disable_camera_button = wait.until(
-    #         EC.element_to_be_clickable((By.XPATH, '//*[@id="yDmH0d"]/c-wiz/div/div/div[14]/div[3]/div/div[2]/div[4]/div/div/div[1]/div[1]/div/div[6]/div[2]/div'))
-    #     )
-    #     disable_camera_button.click()
-    # except TimeoutException:
-    #     print("Disable camera button not found or not clickable")
-    
-    try:
-        print("Try to set name")
-        name_input_selectors = [
-            '//*[@id="yDmH0d"]/c-wiz/div/div/div[14]/div[3]/div/div[2]/div[4]/div/div/div[2]/div[1]/div[1]/div[3]/label/input',
-            '//input[@type="text"]',
-            '//input[contains(@placeholder, "Your name")]',
-            '//input[contains(@aria-label, "Your name")]'
-        ]
-        
-        name_set = False
-        for selector in name_input_selectors:
-            try:
-                name_input = driver.find_element(By.XPATH, selector)
-                name_input.click()
-                sleep(1)
-                name_input.send_keys("Recos AI Bot")
-                sleep(1)
-                driver.save_screenshot("screenshots/give_non_registered_name.png")
-                name_set = True
-                break
-            except:
-                continue
-        
-        if name_set:
-            print("Name set successfully")
-            join_button_selectors = [
-                '//*[@id="yDmH0d"]/c-wiz/div/div/div[14]/div[3]/div/div[2]/div[4]/div/div/div[2]/div[1]/div[2]/div[1]/div[1]/button/span',
-                '//button[contains(text(), "Join now")]',
-                '//button[contains(text(), "Ask to join")]',
-                '//button[contains(text(), "Continue")]',
-                '//button[contains(text(), "Join")]'
-            ]
-            
-            button_clicked = False
-            for selector in join_button_selectors:
-                try:
-                    join_button = driver.find_element(By.XPATH, selector)
-                    join_button.click()
-                    sleep(2)
-                    button_clicked = True
-                    break
-                except:
-                    continue
-            
-            if not button_clicked:
-                print("Could not find or click the join button")
-    except Exception as e:
-        print(f"Error setting name: {e}")
+    flow = JoinFlow(driver, meet_link, email, password, trace=trace, signed_in=warm)
+    in_call = await flow.run()
+    bot_state['join'] = flow.get_status()
 
     if bot_state['status'] == 'stopping':
         print("Stop signal received, cleaning up")
         cleanup_bot()
         return
-
-    try:
-        print("Looking for any join button...")
-        wait = WebDriverWait(driver, 5)
-        
-        join_button_selectors = [
-            "//span[contains(text(), 'Ask to join')]",
-            "//span[contains(text(), 'Join now')]",
-            "//span[contains(text(), 'Switch here')]",
-            "//span[contains(text(), 'Join')]",
-            "//span[contains(text(), 'Continue')]",
-            "//span[contains(text(), 'Request to join')]",
-            "//button[contains(text(), 'Ask to join')]",
-            "//button[contains(text(), 'Join now')]",
-            "//button[contains(text(), 'Request to join')]",
-            "//button[contains(text(), 'Join')]",
-            "//button[contains(text(), 'Continue')]",
-            "//button[contains(@aria-label, 'Join now')]",
-            "//button[contains(@aria-label, 'Ask to join')]",
-            "//button[contains(@aria-label, 'Join')]",
-            "//button[contains(@aria-label, 'Continue')]",
-            "//button[contains(@data-tooltip, 'Ask to join')]",
-            "//button[contains(@data-tooltip, 'Join now')]",
-            "//button[contains(@data-tooltip, 'Join')]",
-            "//button[contains(@data-tooltip, 'Continue')]",
-            "//div[contains(text(), 'Ask to join')]",
-            "//div[contains(text(), 'Request to join')]",
-            "//div[contains(text(), 'Join now')]",
-            "//div[contains(text(), 'Join')]",
-            "//div[contains(text(), 'Continue')]",
-            "//div[contains(@aria-label, 'Ask to join')]",
-            "//div[contains(@aria-label, 'Join now')]",
-            "//div[contains(@aria-label, 'Join')]",
-            "//div[contains(@aria-label, 'Continue')]",
-            "//div[contains(@data-tooltip, 'Ask to join')]",
-            "//div[contains(@data-tooltip, 'Join now')]",
-            "//div[contains(@data-tooltip, 'Join')]",
-            "//div[contains(@data-tooltip, 'Continue')]"
-        ]
-        
-        joined = False
-        for selector in join_button_selectors:
-            try:
-                join_button = wait.until(EC.element_to_be_clickable((By.XPATH, selector)))
-                join_button.click()
-                print(f"Clicked join button using selector: {selector}")
-                joined = True
-                break
-            except TimeoutException:
-                continue
-        
-        if not joined:
-            print("Could not find any join button")
-    except Exception as e:
-        print(f"Error handling join button: {e}")
-
-    if bot_state['status'] == 'stopping':
-        print("Stop signal received, cleaning up")
+    if flow.failed:
+        print(f"Join failed in state {flow.state}")
+        # A browser that could not sign in or load Meet is not worth keeping warm
+        bot_state['driver'] = None
+        release_driver(driver, reuse=False)
+        bot_state['status'] = 'error'
         cleanup_bot()
         return
+    if in_call:
+        print("Successfully joined the meeting!")
+    else:
+        print("Could not confirm if in meeting, proceeding anyway...")
 
-    print("Waiting for meeting to load...")
-    sleep(5)
-
-    try:
-        wait = WebDriverWait(driver, 5)
-        
-        meeting_indicators = [
-            "//div[contains(@data-self-name, 'Recos AI Bot')]",
-            "//span[contains(text(), 'You')]",
-            "//div[contains(@aria-label, 'You are')]",
-            "//button[contains(@aria-label, 'Leave call')]",
-            "//button[contains(@data-tooltip, 'Leave call')]",
-            "//div[contains(text(), 'Meeting details')]",
-            "//div[contains(text(), 'People')]",
-            "//div[contains(text(), 'Chat')]",
-            "//div[contains(text(), 'Activities')]"
-        ]
-        
-        in_meeting = False
-        for selector in meeting_indicators:
-            try:
-                wait.until(EC.presence_of_element_located((By.XPATH, selector)))
-                in_meeting = True
-                print(f"Detected meeting using selector: {selector}")
-                break
-            except TimeoutException:
-                continue
-        
-        if in_meeting:
-            print("Successfully joined the meeting!")
-        else:
-            print("Could not confirm if in meeting, proceeding anyway...")
-    except Exception as e:
-        print(f"Error checking meeting status: {e}")
-
-    if bot_state['status'] == 'stopping':
-        print("Stop signal received, cleaning up")
-        cleanup_bot()
-        return
-    
     duration_minutes = duration  
     duration_seconds = duration_minutes * 60
 
-    audio_streamer = RealtimeAudioStreamer(backend_url)
+    audio_streamer = create_audio_streamer(backend_url, audio_options, token, interview_id, trace.session_id)
     bot_state['audio_streamer'] = audio_streamer
 
     print("\nStarting system audio recording and streaming...")
     print(f"Duration: {duration_minutes} minutes")
     
-    streaming_thread = audio_streamer.start_realtime_streaming(duration_minutes)
+    audio_streamer.start_realtime_streaming(duration_minutes)
     print(f"Recording system audio for {duration_minutes} minutes...")
 
     elapsed = 0
     last_status_check = 0
     status_check_interval = 60  
     
+    time_to_audio = None
     while elapsed < duration_seconds and bot_state['status'] != 'stopping':
         await asyncio.sleep(1)
         elapsed += 1
+
+        if time_to_audio is None and audio_streamer.first_audio_at and bot_state['start_monotonic']:
+            time_to_audio = audio_streamer.first_audio_at - bot_state['start_monotonic']
+            join_metrics['time_to_audio'].record(time_to_audio)
+            bot_state['join']['time_to_audio_seconds'] = round(time_to_audio, 3)
+            trace.instant('audio_flowing', 'audio', {'seconds_since_start': round(time_to_audio, 3)})
+            print(f"⏱️ Audio flowing {time_to_audio:.1f}s after /start")
         
+        if elapsed == 30 and audio_streamer.bytes_transmitted == 0:
+            print("WARNING: No audio data transmitted after 30 seconds!")
+
         if elapsed - last_status_check >= status_check_interval:
-            if elapsed == 30 and audio_streamer.bytes_transmitted == 0:
-                print("WARNING: No audio data transmitted after 30 seconds!")
-            
             if not audio_streamer.is_connected:
                 print(f"WARNING: WebSocket disconnected at {elapsed} seconds")
                 
             print(f"Status check at {elapsed}s: Connected={audio_streamer.is_connected}, "
-                  f"Bytes sent={audio_streamer.bytes_transmitted/1024:.2f}KB")
+                  f"Bytes sent={audio_streamer.bytes_transmitted/1024:.2f}KB, "
+                  f"Capture restarts={audio_streamer.capture_restarts}, "
+                  f"Capture gaps={audio_streamer.capture_gap_seconds:.1f}s")
             last_status_check = elapsed
     
-    if streaming_thread:
-        for thread in streaming_thread:
-            if thread.is_alive():
-                thread.join(timeout=10)
+    audio_streamer.stop_streaming()
+    await audio_streamer.wait_stopped(timeout=audio_streamer.drain_seconds + 10)
 
     print("Cleaning up session...")
-    if driver:
-        try:
-            driver.quit()
-            print("Chrome driver quit")
-        except Exception as e:
-            print(f"Error quitting driver: {e}")
+    if bot_state['driver'] is driver:
+        bot_state['driver'] = None
+        release_driver(driver)
     
     bot_state['status'] = 'idle'
     bot_state['driver'] = None
@@ -1050,6 +4700,7 @@ def run_flask_server():
     """Run Flask server in the main thread"""
     port = int(os.getenv('PORT', 10000))
     print(f"Starting Flask server on port {port}")
+    start_browser_pool()
     app.run(host='0.0.0.0', port=port, debug=False, use_reloader=False)
 
 def run_production_server():
@@ -1075,13 +4726,19 @@ def run_production_server():
         options = {
             'bind': f'0.0.0.0:{port}',
             'workers': 1,  
+            # Threads so /sessions/<id>/audio streams do not hold up every other request
+            'worker_class': 'gthread',
+            'threads': int(os.getenv('HTTP_THREADS', '8')),
             'timeout': 120,
             'accesslog': '-',
             'errorlog': '-',
             'keepalive': 5,
             'max_requests': 1000,
             'max_requests_jitter': 100,
-            'preload_app': True
+            'preload_app': True,
+            # Pool threads and browsers belong to the worker, not the preloading master
+            'post_worker_init': lambda worker: start_browser_pool(),
+            'worker_exit': lambda server, worker: browser_pool and browser_pool.close()
         }
         
         print(f"Starting production server on port {port}")
@@ -1089,6 +4746,7 @@ def run_production_server():
         
     except ImportError:
         print("Gunicorn not available, falling back to Flask development server")
+        start_browser_pool()
         app.run(host='0.0.0.0', port=port, debug=False)
 
 @click.command()
@@ -0,0 +1,95 @@
+"""Round trip of encoded audio through a stand-in backend websocket
+
+Run with `python -m pytest -q test_audio_codecs.py`. Needs ffmpeg on PATH,
+as in the container; skipped otherwise.
+"""
+import asyncio
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+import websockets
+
+from gmeet import BYTES_PER_SECOND, CHANNELS, SAMPLE_RATE, FfmpegAudioEncoder
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+CONTAINER_FORMATS = {'flac': 'flac', 'opus': 'ogg'}
+
+
+def make_clip(seconds=2.0):
+    """Two tones at speech-like level, 16 kHz mono s16le"""
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    wave = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.2 * np.sin(2 * np.pi * 1250 * t)
+    return (wave * 32767).astype('<i2').tobytes()
+
+
+def decode(codec, data):
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", CONTAINER_FORMATS[codec], "-i", "pipe:0",
+         "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS), "pipe:1"],
+        input=data, capture_output=True, check=True
+    )
+    return result.stdout
+
+
+async def round_trip(codec, pcm, frame_ms=20):
+    """Stream pcm frame by frame through the encoder to a local server, returns the messages it got"""
+    received = []
+    closed = asyncio.Event()
+
+    async def backend(websocket):
+        async for message in websocket:
+            received.append(message)
+        closed.set()
+
+    async with websockets.serve(backend, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        encoder = FfmpegAudioEncoder(codec, bitrate=32000, frame_ms=frame_ms).open()
+        frame_bytes = BYTES_PER_SECOND * frame_ms // 1000
+        async with websockets.connect(f"ws://127.0.0.1:{port}") as websocket:
+            for offset in range(0, len(pcm), frame_bytes):
+                payload = encoder.encode(pcm[offset:offset + frame_bytes])
+                if payload:
+                    await websocket.send(payload)
+                # Real time would be frame_ms; a little is enough for ffmpeg to emit as it goes
+                await asyncio.sleep(0.001)
+            tail = encoder.close()
+            if tail:
+                await websocket.send(tail)
+        await asyncio.wait_for(closed.wait(), 5)
+    return received
+
+
+def test_flac_round_trip_is_lossless():
+    pcm = make_clip()
+    received = asyncio.run(round_trip('flac', pcm))
+
+    assert all(isinstance(message, bytes) for message in received)
+    encoded = b"".join(received)
+    assert len(encoded) < len(pcm)
+    assert decode('flac', encoded) == pcm
+
+
+def test_opus_round_trip_keeps_length_and_content():
+    pcm = make_clip()
+    received = asyncio.run(round_trip('opus', pcm))
+
+    assert len(received) > 1, "opus output should be streamed, not sent in one piece at close"
+    encoded = b"".join(received)
+    assert len(encoded) < len(pcm) / 4
+    decoded = decode('opus', encoded)
+
+    # Opus pads to whole frames; the ogg end trimming should bring it back within one frame
+    assert abs(len(decoded) - len(pcm)) <= BYTES_PER_SECOND * 20 // 1000
+    original = np.frombuffer(pcm, dtype='<i2').astype(np.float64)
+    restored = np.frombuffer(decoded, dtype='<i2').astype(np.float64)
+    length = min(len(original), len(restored))
+    correlation = np.corrcoef(original[:length], restored[:length])[0, 1]
+    assert correlation > 0.9
+
+    spectrum = np.abs(np.fft.rfft(restored[:length]))
+    frequencies = np.fft.rfftfreq(length, 1 / SAMPLE_RATE)
+    peaks = sorted(frequencies[np.argsort(spectrum)[-2:]])
+    assert peaks == pytest.approx([440, 1250], abs=2)
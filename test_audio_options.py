@@ -0,0 +1,42 @@
+"""/start option validation, so bad values are a 400 rather than a failure after joining
+
+Run with `python -m pytest -q test_audio_options.py`.
+"""
+import pytest
+
+from gmeet import get_stream_profile, validate_audio_options
+
+
+@pytest.mark.parametrize('frame_ms', [0, -20, 0.5, 12.5, 'abc', float('nan')])
+def test_frame_ms_must_be_a_positive_whole_number(frame_ms):
+    with pytest.raises(ValueError, match='frame_ms'):
+        validate_audio_options({'frame_ms': frame_ms})
+
+
+def test_frame_ms_override_is_applied():
+    assert get_stream_profile('balanced', '40')['frame_ms'] == 40
+    assert get_stream_profile('balanced')['frame_ms'] == 128
+
+
+@pytest.mark.parametrize('options, name', [
+    ({'bitrate': 1.5}, 'bitrate'),
+    ({'bitrate': -32000}, 'bitrate'),
+    ({'buffer_seconds': -1}, 'buffer_seconds'),
+    ({'buffer_seconds': 'lots'}, 'buffer_seconds'),
+    ({'drain_seconds': -5}, 'drain_seconds'),
+    ({'failover_seconds': 'inf'}, 'failover_seconds'),
+    ({'recording': {'segment_seconds': -300}}, 'recording.segment_seconds'),
+])
+def test_numeric_options_are_rejected(options, name):
+    with pytest.raises(ValueError, match=name):
+        validate_audio_options(options)
+
+
+def test_bad_environment_default_is_rejected(monkeypatch):
+    monkeypatch.setenv("AUDIO_BUFFER_SECONDS", "0")
+    with pytest.raises(ValueError, match='buffer_seconds'):
+        validate_audio_options({})
+
+
+def test_zero_drain_and_failover_are_allowed():
+    validate_audio_options({'drain_seconds': 0, 'failover_seconds': '0', 'bitrate': '24000'})
@@ -0,0 +1,113 @@
+"""Encoder flush and restart on format and frame size changes, with a stand-in encoder
+
+Run with `python -m pytest -q test_encoder_switch.py`; no ffmpeg needed.
+"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+import gmeet
+from gmeet import QUALITY_TIERS, RealtimeAudioStreamer, ms_to_bytes
+
+
+class FakeEncoder:
+    """Records its framing; close() blocks like ffmpeg finishing and returns a marked tail"""
+    opened = []
+
+    def __init__(self, codec, bitrate=32000, frame_ms=20, sample_rate=gmeet.SAMPLE_RATE):
+        self.codec = codec
+        self.frame_ms = frame_ms
+        self.sample_rate = sample_rate
+        self.closed_on = None
+
+    def open(self):
+        FakeEncoder.opened.append(self)
+        return self
+
+    def encode(self, pcm):
+        return b"enc%d:" % self.frame_ms + pcm
+
+    def close(self):
+        self.closed_on = threading.current_thread()
+        threading.Event().wait(0.2)
+        return b"tail%d" % self.frame_ms
+
+
+class FakeWebsocket:
+    closed = False
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+@pytest.fixture
+def streamer(monkeypatch):
+    FakeEncoder.opened = []
+    monkeypatch.setattr(gmeet, 'FfmpegAudioEncoder', FakeEncoder)
+    streamer = RealtimeAudioStreamer("http://127.0.0.1:1", {'codec': 'opus', 'protocol': 'legacy'})
+    streamer.websocket = FakeWebsocket()
+    streamer._open_encoder()
+    return streamer
+
+
+async def ticks_while(coroutine):
+    """Run coroutine and count how often a 10 ms ticker got the loop meanwhile"""
+    count = 0
+    done = asyncio.ensure_future(coroutine)
+    while not done.done():
+        await asyncio.sleep(0.01)
+        count += 1
+    await done
+    return count
+
+
+def test_backend_frame_size_restarts_the_encoder(streamer):
+    old = streamer.encoder
+    streamer._handle_backend_message(json.dumps({'type': 'start_ack', 'frame_ms': 60}))
+    # Nothing changes under the sender until it applies the request between frames
+    assert streamer.encoder is old and streamer.profile['frame_ms'] != 60
+
+    ticks = asyncio.run(ticks_while(streamer._apply_backend_frame_ms()))
+
+    assert old.closed_on is not threading.main_thread()
+    assert ticks >= 10, "closing the encoder must not block the event loop"
+    assert streamer.encoder is FakeEncoder.opened[-1] and streamer.encoder.frame_ms == 60
+    assert streamer.frame_bytes == ms_to_bytes(60)
+    tail, announcement = streamer.websocket.sent
+    assert tail == b"tail%d" % old.frame_ms
+    assert json.loads(announcement)['frame_ms'] == 60
+    assert streamer._pending_frame_flags & gmeet.FRAME_FLAG_FORMAT_CHANGE
+
+
+@pytest.mark.parametrize('frame_ms', [0, -20, 0.5, 'abc'])
+def test_bad_backend_frame_size_is_ignored(streamer, frame_ms):
+    streamer._handle_backend_message(json.dumps({'type': 'start_ack', 'frame_ms': frame_ms}))
+
+    assert streamer._backend_frame_ms is None
+
+
+def test_same_frame_size_keeps_the_encoder(streamer):
+    old = streamer.encoder
+    streamer._handle_backend_message(json.dumps({'type': 'start_ack', 'frame_ms': streamer.profile['frame_ms']}))
+    asyncio.run(streamer._apply_backend_frame_ms())
+
+    assert streamer.encoder is old and old.closed_on is None
+    assert streamer.websocket.sent == []
+
+
+def test_tier_switch_flushes_without_blocking_the_loop(streamer):
+    streamer.quality = gmeet.AdaptiveQualityController(tier=1)
+    old = streamer.encoder
+
+    ticks = asyncio.run(ticks_while(streamer._switch_tier(QUALITY_TIERS[0])))
+
+    assert ticks >= 10
+    assert streamer.encoder is None and streamer.codec == 'raw'
+    tail, announcement = streamer.websocket.sent
+    assert tail == b"tail%d" % old.frame_ms
+    assert json.loads(announcement)['codec'] == 'raw'
@@ -0,0 +1,57 @@
+"""Local audio fan-out: shared ring reads, gaps and slow subscribers
+
+Run with `python -m pytest -q test_fanout.py`.
+"""
+from gmeet import AudioFanout
+
+
+def test_subscribers_read_views_of_the_shared_ring():
+    fanout = AudioFanout(64)
+    first, second = fanout.subscribe(), fanout.subscribe()
+    fanout.write(b"abcdefgh")
+
+    a, b = first.read(timeout=0), second.read(timeout=0)
+
+    assert isinstance(a, memoryview) and isinstance(b, memoryview)
+    assert a.obj is b.obj is fanout._buffer
+    assert bytes(a) == bytes(b) == b"abcdefgh"
+    assert first.read(timeout=0) == b""
+
+
+def test_read_stops_at_the_end_of_the_ring():
+    fanout = AudioFanout(8)
+    subscriber = fanout.subscribe()
+    fanout.write(b"1234")
+    assert bytes(subscriber.read(timeout=0)) == b"1234"
+    fanout.write(b"56")
+    assert bytes(subscriber.read(timeout=0)) == b"56"
+
+    fanout.write(b"7890")
+    assert bytes(subscriber.read(timeout=0)) == b"78"
+    assert bytes(subscriber.read(timeout=0)) == b"90"
+
+
+def test_oversize_write_leaves_a_gap():
+    fanout = AudioFanout(8)
+    subscriber = fanout.subscribe()
+    fanout.write(b"0123456789ab")
+
+    assert fanout._write_total == 12
+    # The four bytes that did not fit are skipped, not silently spliced out
+    assert subscriber.read(timeout=0) == b""
+    assert subscriber.skipped_bytes == 12
+    fanout.write(b"cd")
+    assert bytes(subscriber.read(timeout=0)) == b"cd"
+
+
+def test_slice_overwritten_while_held_counts_as_slow():
+    fanout = AudioFanout(8, 'drop')
+    subscriber = fanout.subscribe()
+    fanout.write(b"0123")
+    held = subscriber.read(timeout=0)
+    assert bytes(held) == b"0123"
+
+    # The writer laps the slice while the subscriber is still sending it
+    fanout.write(b"45678")
+    assert subscriber.read(timeout=0) is None
+    assert subscriber.closed
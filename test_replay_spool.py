@@ -0,0 +1,91 @@
+"""Which audio survives a backend outage, per overflow policy
+
+Run with `python -m pytest -q test_replay_spool.py`.
+"""
+import numpy as np
+import pytest
+
+from gmeet import BYTES_PER_SECOND, SAMPLE_WIDTH, RealtimeAudioStreamer, ReplaySpool
+
+
+class CountingReader:
+    """Capture stand-in whose samples count up, so any byte tells its stream position"""
+
+    def __init__(self):
+        self.samples = 0
+
+    def readinto(self, buffer):
+        count = len(buffer) // SAMPLE_WIDTH
+        values = (np.arange(self.samples, self.samples + count) % 65536).astype('<u2')
+        buffer[:count * SAMPLE_WIDTH] = values.tobytes()
+        self.samples += count
+        return count * SAMPLE_WIDTH
+
+
+def positions(data):
+    return np.frombuffer(data, dtype='<u2')
+
+
+def spooled(spool):
+    data = b""
+    while spool.size():
+        chunk = spool.peek(spool.size())
+        data += bytes(chunk)
+        spool.consume(len(chunk))
+    return data
+
+
+def run_outage(monkeypatch, policy, seconds):
+    """Capture for seconds with the backend down, spooling the ring the way the reconnect backoff does"""
+    monkeypatch.delenv("AUDIO_SPOOL_DIR", raising=False)
+    streamer = RealtimeAudioStreamer("http://127.0.0.1:1", {'overflow_policy': policy, 'buffer_seconds': 2})
+    reader = CountingReader()
+    spool_every = BYTES_PER_SECOND // 2
+    captured = 0
+    while captured < seconds * BYTES_PER_SECOND:
+        captured += streamer.audio_buffer.fill_from(reader, streamer.chunk_size)
+        if captured % spool_every < streamer.chunk_size:
+            streamer._spool_buffered_audio()
+    streamer._spool_buffered_audio()
+    return streamer, captured
+
+
+@pytest.mark.parametrize('policy', ['drop-oldest', 'drop-newest'])
+def test_memory_spool_is_capped_at_buffer_seconds(monkeypatch, policy):
+    streamer, captured = run_outage(monkeypatch, policy, 10)
+
+    assert streamer.spool.size() == streamer.high_water_bytes
+    assert streamer.spool.lost_bytes == captured - streamer.high_water_bytes
+
+
+def test_drop_oldest_keeps_the_latest_audio(monkeypatch):
+    streamer, captured = run_outage(monkeypatch, 'drop-oldest', 10)
+    kept = streamer.spool.size()
+
+    first_kept = (captured - kept) // SAMPLE_WIDTH
+    assert streamer.spool.head_position() == captured - kept
+    samples = positions(spooled(streamer.spool))
+    assert samples[0] == first_kept % 65536
+    assert samples[-1] == (captured // SAMPLE_WIDTH - 1) % 65536
+    assert np.all(np.diff(samples.astype(np.int64)) % 65536 == 1)
+
+
+def test_drop_newest_keeps_the_start_of_the_outage(monkeypatch):
+    streamer, captured = run_outage(monkeypatch, 'drop-newest', 10)
+    kept = streamer.spool.size()
+
+    assert streamer.spool.head_position() == 0
+    samples = positions(spooled(streamer.spool))
+    assert samples[0] == 0
+    assert samples[-1] == kept // SAMPLE_WIDTH - 1
+
+
+def test_drop_oldest_drops_across_memory_and_file(tmp_path):
+    spool = ReplaySpool(8, 4, str(tmp_path), 'drop-oldest')
+    spool.append(b"aabb", 0)
+    spool.append(b"ccdd", 4)
+    spool.append(b"eeff", 8)
+
+    assert spool.lost_bytes == 4
+    assert spool.head_position() == 4
+    assert spooled(spool) == b"ccddeeff"
@@ -0,0 +1,62 @@
+"""Capture ring accounting when the watchdog replaces a stuck capture worker
+
+Run with `python -m pytest -q test_ring_buffer.py`.
+"""
+import threading
+
+from gmeet import AudioRingBuffer
+
+
+class StuckReader:
+    """A read that blocks until released, then claims bytes without touching the buffer, like an abandoned backend"""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def readinto(self, buffer):
+        self.entered.set()
+        self.release.wait(5)
+        return len(buffer)
+
+
+class PatternReader:
+    def __init__(self, value):
+        self.value = value
+
+    def readinto(self, buffer):
+        buffer[:] = bytes([self.value]) * len(buffer)
+        return len(buffer)
+
+
+def test_stale_read_is_discarded_when_it_returns():
+    ring = AudioRingBuffer(4096)
+    ring.writer_generation = 1
+    stuck = StuckReader()
+    results = []
+    worker = threading.Thread(target=lambda: results.append(ring.fill_from(stuck, 512, 1)))
+    worker.start()
+    assert stuck.entered.wait(5)
+
+    # The watchdog gives up on it and starts a replacement worker
+    ring.writer_generation = 2
+    assert ring.fill_from(PatternReader(7), 512, 2) == 512
+    written, position = ring.last_written, ring.last_written_position
+
+    stuck.release.set()
+    worker.join(5)
+
+    assert results == [0]
+    assert ring.available() == 512
+    assert ring.last_written is written and position == 0
+    assert bytes(ring.peek(4096)) == bytes([7]) * 512
+    assert ring.fill_from(PatternReader(8), 512, 2) == 512
+    assert ring.last_written_position == 512
+
+
+def test_untagged_fills_are_always_kept():
+    ring = AudioRingBuffer(4096)
+    ring.writer_generation = 3
+
+    assert ring.fill_from(PatternReader(1), 256) == 256
+    assert ring.available() == 256